@@ -0,0 +1,35 @@
+"""Composite (user_id, wa_id) index on contacts
+
+Revision ID: 003_contacts_user_wa
+Revises: 002_add_chats_count
+Create Date: 2026-10-14
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = '003_contacts_user_wa'
+down_revision: Union[str, None] = '002_add_chats_count'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # (user_id, wa_id) lookups; also serves user_id-only filters
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_contacts_user_wa "
+            "ON contacts (user_id, wa_id)"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_contacts_user_id")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_contacts_user_id "
+            "ON contacts (user_id)"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_contacts_user_wa")
@@ -0,0 +1,29 @@
+"""Add password_algo_version to users
+
+Revision ID: 004_password_algo_version
+Revises: 003_contacts_user_wa
+Create Date: 2026-10-14
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '004_password_algo_version'
+down_revision: Union[str, None] = '003_contacts_user_wa'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing hashes are plain bcrypt (version 1); they are upgraded on next login
+    op.add_column(
+        'users',
+        sa.Column('password_algo_version', sa.Integer(), nullable=False, server_default='1')
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'password_algo_version')
@@ -0,0 +1,36 @@
+"""Drop ix_*_id indexes that duplicate the primary keys
+
+Revision ID: 005_drop_redundant_pk_indexes
+Revises: 004_password_algo_version
+Create Date: 2026-10-14
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = '005_drop_redundant_pk_indexes'
+down_revision: Union[str, None] = '004_password_algo_version'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Each primary key already has its own unique index (<table>_pkey)
+PK_INDEXES = (
+    ('ix_users_id', 'users'),
+    ('ix_evolution_instances_id', 'evolution_instances'),
+    ('ix_contacts_id', 'contacts'),
+    ('ix_conversations_id', 'conversations'),
+    ('ix_messages_id', 'messages'),
+)
+
+
+def upgrade() -> None:
+    for index_name, table_name in PK_INDEXES:
+        op.drop_index(index_name, table_name=table_name, if_exists=True)
+
+
+def downgrade() -> None:
+    for index_name, table_name in PK_INDEXES:
+        op.create_index(index_name, table_name, ['id'], if_not_exists=True)
@@ -0,0 +1,36 @@
+"""Store raw_data as JSONB
+
+Revision ID: 006_raw_data_jsonb
+Revises: 005_drop_redundant_pk_indexes
+Create Date: 2026-10-14
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = '006_raw_data_jsonb'
+down_revision: Union[str, None] = '005_drop_redundant_pk_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for table_name in ('messages', 'evolution_instances'):
+        op.alter_column(
+            table_name, 'raw_data',
+            type_=postgresql.JSONB(astext_type=sa.Text()),
+            postgresql_using='raw_data::jsonb',
+        )
+
+
+def downgrade() -> None:
+    for table_name in ('messages', 'evolution_instances'):
+        op.alter_column(
+            table_name, 'raw_data',
+            type_=sa.JSON(),
+            postgresql_using='raw_data::json',
+        )
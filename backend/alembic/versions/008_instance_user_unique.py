@@ -0,0 +1,39 @@
+"""Enforce one Evolution instance per user
+
+Revision ID: 008_instance_user_unique
+Revises: 006_raw_data_jsonb
+Create Date: 2026-10-14
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '008_instance_user_unique'
+down_revision: Union[str, None] = '006_raw_data_jsonb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+CONSTRAINT_NAME = 'evolution_instances_user_id_key'
+
+
+def upgrade() -> None:
+    existing = {
+        c['name'] for c in sa.inspect(op.get_bind()).get_unique_constraints('evolution_instances')
+    }
+    if CONSTRAINT_NAME in existing:
+        return
+
+    # Keep the oldest row if a get-or-create race ever produced duplicates
+    op.execute(
+        "DELETE FROM evolution_instances a USING evolution_instances b "
+        "WHERE a.user_id = b.user_id AND a.id > b.id"
+    )
+    op.create_unique_constraint(CONSTRAINT_NAME, 'evolution_instances', ['user_id'])
+
+
+def downgrade() -> None:
+    op.execute(f"ALTER TABLE evolution_instances DROP CONSTRAINT IF EXISTS {CONSTRAINT_NAME}")
@@ -0,0 +1,49 @@
+"""Make (user_id, wa_id) unique on contacts
+
+Revision ID: 009_contacts_user_wa_unique
+Revises: 008_instance_user_unique
+Create Date: 2026-10-14
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '009_contacts_user_wa_unique'
+down_revision: Union[str, None] = '008_instance_user_unique'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    indexes = {
+        i['name']: i for i in sa.inspect(op.get_bind()).get_indexes('contacts')
+    }
+    if indexes.get('ix_contacts_user_wa', {}).get('unique'):
+        return
+
+    # Fold duplicate contacts into the oldest row before enforcing uniqueness
+    for table_name in ('messages', 'conversations'):
+        op.execute(f"""
+            UPDATE {table_name} t SET contact_id = d.keep_id
+            FROM (
+                SELECT id, min(id) OVER (PARTITION BY user_id, wa_id) AS keep_id
+                FROM contacts
+            ) d
+            WHERE t.contact_id = d.id AND d.id <> d.keep_id
+        """)
+    op.execute(
+        "DELETE FROM contacts a USING contacts b "
+        "WHERE a.user_id = b.user_id AND a.wa_id = b.wa_id AND a.id > b.id"
+    )
+
+    # Conflict target for the bulk contact upsert in the Evolution sync
+    op.drop_index('ix_contacts_user_wa', table_name='contacts', if_exists=True)
+    op.create_index('ix_contacts_user_wa', 'contacts', ['user_id', 'wa_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_wa', table_name='contacts', if_exists=True)
+    op.create_index('ix_contacts_user_wa', 'contacts', ['user_id', 'wa_id'])
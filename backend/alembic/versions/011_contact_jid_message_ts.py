@@ -0,0 +1,58 @@
+"""Unique (user_id, evolution_remote_jid) on contacts; (contact_id, timestamp) on messages
+
+Revision ID: 011_contact_jid_message_ts
+Revises: 009_contacts_user_wa_unique
+Create Date: 2026-10-14
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '011_contact_jid_message_ts'
+down_revision: Union[str, None] = '009_contacts_user_wa_unique'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    indexes = {
+        i['name']: i for i in sa.inspect(op.get_bind()).get_indexes('contacts')
+    }
+    if not indexes.get('ix_contacts_user_jid', {}).get('unique'):
+        # Fold contacts sharing a remote JID into the oldest row first
+        for table_name in ('messages', 'conversations'):
+            op.execute(f"""
+                UPDATE {table_name} t SET contact_id = d.keep_id
+                FROM (
+                    SELECT id, min(id) OVER (PARTITION BY user_id, evolution_remote_jid) AS keep_id
+                    FROM contacts
+                    WHERE evolution_remote_jid IS NOT NULL
+                ) d
+                WHERE t.contact_id = d.id AND d.id <> d.keep_id
+            """)
+        op.execute(
+            "DELETE FROM contacts a USING contacts b "
+            "WHERE a.user_id = b.user_id AND a.evolution_remote_jid = b.evolution_remote_jid "
+            "AND a.id > b.id"
+        )
+        # Webhook and chat sync resolve contacts by (user_id, remote JID)
+        op.drop_index('ix_contacts_user_jid', table_name='contacts', if_exists=True)
+        op.create_index(
+            'ix_contacts_user_jid', 'contacts', ['user_id', 'evolution_remote_jid'], unique=True
+        )
+
+    # GET /messages?contact_id=... orders one contact's messages by timestamp
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_messages_contact_ts "
+            "ON messages (contact_id, timestamp DESC)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_messages_contact_ts")
+    op.drop_index('ix_contacts_user_jid', table_name='contacts', if_exists=True)
@@ -0,0 +1,30 @@
+"""Keyset pagination index on messages (timestamp, id)
+
+Revision ID: 012_messages_ts_id
+Revises: 011_contact_jid_message_ts
+Create Date: 2026-10-14
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = '012_messages_ts_id'
+down_revision: Union[str, None] = '011_contact_jid_message_ts'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # GET /messages pages newest-first by (timestamp, id) cursor
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_messages_ts_id "
+            "ON messages (timestamp DESC, id DESC)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_messages_ts_id")
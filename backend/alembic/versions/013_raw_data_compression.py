@@ -0,0 +1,44 @@
+"""LZ4-compress raw_data and push it out of the messages heap
+
+Revision ID: 013_raw_data_compression
+Revises: 012_messages_ts_id
+Create Date: 2026-10-14
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '013_raw_data_compression'
+down_revision: Union[str, None] = '012_messages_ts_id'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+RAW_DATA_TABLES = ('messages', 'evolution_instances')
+
+
+def _lz4_available() -> bool:
+    # Servers built without lz4 only offer pglz
+    enumvals = op.get_bind().execute(sa.text(
+        "SELECT enumvals FROM pg_settings WHERE name = 'default_toast_compression'"
+    )).scalar()
+    return bool(enumvals) and 'lz4' in enumvals
+
+
+def upgrade() -> None:
+    # Applies to newly written values; existing rows keep pglz until rewritten
+    if _lz4_available():
+        for table_name in RAW_DATA_TABLES:
+            op.execute(f"ALTER TABLE {table_name} ALTER COLUMN raw_data SET COMPRESSION lz4")
+    # Payloads are TOASTed once a row passes ~256 bytes rather than ~2kB, so the
+    # messages heap holds only the narrow columns that reads and counts scan
+    op.execute("ALTER TABLE messages SET (toast_tuple_target = 256)")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE messages RESET (toast_tuple_target)")
+    if _lz4_available():
+        for table_name in RAW_DATA_TABLES:
+            op.execute(f"ALTER TABLE {table_name} ALTER COLUMN raw_data SET COMPRESSION default")
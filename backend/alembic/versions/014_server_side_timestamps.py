@@ -0,0 +1,42 @@
+"""Default created/updated timestamps to the database clock
+
+Revision ID: 014_server_side_timestamps
+Revises: 013_raw_data_compression
+Create Date: 2026-10-14
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '014_server_side_timestamps'
+down_revision: Union[str, None] = '013_raw_data_compression'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Columns the models now default with utc_now(); all stay naive UTC
+TIMESTAMP_COLUMNS = {
+    'users': ('created_at', 'updated_at'),
+    'contacts': ('created_at', 'updated_at'),
+    'conversations': ('started_at', 'last_message_at'),
+    'messages': ('created_at',),
+    'evolution_instances': ('created_at', 'updated_at'),
+}
+
+
+def upgrade() -> None:
+    # Setting a default is catalog-only; no table rewrite
+    for table_name, columns in TIMESTAMP_COLUMNS.items():
+        for column_name in columns:
+            op.alter_column(
+                table_name, column_name,
+                server_default=sa.text("timezone('utc', now())"),
+            )
+
+
+def downgrade() -> None:
+    for table_name, columns in TIMESTAMP_COLUMNS.items():
+        for column_name in columns:
+            op.alter_column(table_name, column_name, server_default=None)
@@ -0,0 +1,31 @@
+"""Drop the single-column contacts JID index
+
+Revision ID: 015_drop_contact_jid_index
+Revises: 014_server_side_timestamps
+Create Date: 2026-10-14
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = '015_drop_contact_jid_index'
+down_revision: Union[str, None] = '014_server_side_timestamps'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Every JID lookup is scoped to a user and served by the unique
+    # ix_contacts_user_jid (011); this one only cost writes
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_contacts_evolution_remote_jid")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_contacts_evolution_remote_jid "
+            "ON contacts (evolution_remote_jid)"
+        )
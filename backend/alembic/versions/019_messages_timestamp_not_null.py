@@ -0,0 +1,41 @@
+"""Make messages.timestamp NOT NULL with a server default
+
+Revision ID: 019_messages_timestamp_not_null
+Revises: 015_drop_contact_jid_index
+Create Date: 2026-10-14
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '019_messages_timestamp_not_null'
+down_revision: Union[str, None] = '015_drop_contact_jid_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # GET /messages pages by a (timestamp, id) cursor; a NULL timestamp
+    # can't be carried in one. Rows without one fall back to when we stored them
+    op.execute(
+        "UPDATE messages SET timestamp = coalesce(created_at, timezone('utc', now())) "
+        "WHERE timestamp IS NULL"
+    )
+    op.alter_column(
+        'messages', 'timestamp',
+        existing_type=sa.DateTime(),
+        nullable=False,
+        server_default=sa.text("timezone('utc', now())"),
+    )
+
+
+def downgrade() -> None:
+    op.alter_column(
+        'messages', 'timestamp',
+        existing_type=sa.DateTime(),
+        nullable=True,
+        server_default=None,
+    )
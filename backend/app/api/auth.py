@@ -1,10 +1,17 @@
-from datetime import timedelta
 import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from pydantic import TypeAdapter
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.core.auth import (
+    PASSWORD_ALGO_CURRENT,
     Token,
     UserCreate,
     UserLogin,
@@ -13,77 +20,108 @@ from app.core.auth import (
     create_access_token,
     get_current_user,
     get_password_hash,
-    get_user_by_email,
+    invalidate_cached_user,
 )
 from app.core.config import settings
 from app.core.database import get_db
+from app.core.rate_limit import limiter
 from app.models.user import User
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+# The DB-bound handlers below are plain defs, so FastAPI already runs them in
+# its threadpool and the sync Session never blocks the event loop. bcrypt is
+# still funnelled through this pool: max_workers caps how many password checks
+# can run at once, which bounds the CPU a burst of login attempts can take.
+_HASH_POOL = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="bcrypt")
+
+# Built once; converts rows/ORM objects to UserResponse without touching
+# anything outside its fields
+_USER_RESPONSE = TypeAdapter(UserResponse)
+
+_ACCESS_TOKEN_EXPIRES = timedelta(minutes=settings.access_token_expire_minutes)
+
+_EMAIL_REGISTERED = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="Email already registered"
+)
+_INVALID_CREDENTIALS = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Incorrect email or password",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
 
 @router.post("/register", response_model=UserResponse)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+@limiter.limit(settings.register_rate_limit)
+def register(request: Request, user_data: UserCreate, db: Session = Depends(get_db)):
     try:
-        existing_user = get_user_by_email(db, user_data.email)
-        if existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered"
-            )
-
-        hashed_password = get_password_hash(user_data.password)
-        db_user = User(
+        hashed_password = _HASH_POOL.submit(get_password_hash, user_data.password).result()
+        # INSERT ... RETURNING: the response columns come back with the insert,
+        # so there is no follow-up SELECT to refresh the row
+        stmt = insert(User).values(
             email=user_data.email,
             hashed_password=hashed_password,
+            password_algo_version=PASSWORD_ALGO_CURRENT,
             name=user_data.name
-        )
-        db.add(db_user)
+        ).returning(User.id, User.email, User.name, User.is_active, User.created_at)
+        # No existence check up front: duplicates are rare, and the unique
+        # index on users.email rejects them in the same round-trip
+        try:
+            db_user = db.execute(stmt).one()
+        except IntegrityError:
+            db.rollback()
+            raise _EMAIL_REGISTERED
         db.commit()
-        db.refresh(db_user)
-        return db_user
+        invalidate_cached_user(user_data.email)
+        return _USER_RESPONSE.validate_python(db_user, from_attributes=True)
 
     except HTTPException:
         raise
-    except Exception as e:
-        logger.exception("Registration failed")
+    except Exception:
+        # Details stay in the log; the client only gets an id to quote
+        error_id = uuid.uuid4().hex[:12]
+        logger.exception("Registration failed (error_id=%s)", error_id)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Registration failed: {type(e).__name__}: {str(e)}"
+            detail="Registration failed",
+            headers={"X-Error-ID": error_id}
         )
 
 
 @router.post("/login", response_model=Token)
-async def login(user_data: UserLogin, db: Session = Depends(get_db)):
-    user = authenticate_user(db, user_data.email, user_data.password)
+@limiter.limit(settings.login_rate_limit)
+def login(request: Request, user_data: UserLogin, db: Session = Depends(get_db)):
+    # Lookup and any rehash commit stay on this thread with the session;
+    # only the bcrypt calls are handed to _HASH_POOL
+    user = authenticate_user(db, user_data.email, user_data.password, hash_pool=_HASH_POOL)
     if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect email or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _INVALID_CREDENTIALS
 
-    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": user.email}, expires_delta=_ACCESS_TOKEN_EXPIRES
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.get("/me", response_model=UserResponse)
 async def get_me(current_user: User = Depends(get_current_user)):
-    return current_user
+    return _USER_RESPONSE.validate_python(current_user, from_attributes=True)
 
 
 @router.put("/me", response_model=UserResponse)
-async def update_me(
+def update_me(
     name: str,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    current_user.name = name
+    # One UPDATE ... RETURNING instead of flush + commit + refresh SELECT.
+    # The email -> id cache is unaffected by a name change.
+    stmt = update(User).where(User.id == current_user.id).values(name=name).returning(
+        User.id, User.email, User.name, User.is_active, User.created_at
+    )
+    db_user = db.execute(stmt).one()
     db.commit()
-    db.refresh(current_user)
-    return current_user
+    return _USER_RESPONSE.validate_python(db_user, from_attributes=True)
@@ -6,16 +6,22 @@ including instance management, contact/message sync, and messaging.
 """
 
 import asyncio
+import functools
+import hashlib
 import logging
-from datetime import datetime
-from typing import Optional
-
-from fastapi import APIRouter, Depends, HTTPException, status
-from pydantic import BaseModel
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from cachetools import TTLCache
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response, status
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import func, update
 from sqlalchemy.orm import Session
 
 from app.core.auth import get_current_user
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal, utc_now
 from app.models.user import User
 from app.models.evolution import EvolutionInstance
 from app.models.whatsapp import Contact, Message
@@ -27,6 +33,8 @@ router = APIRouter(prefix="/evolution", tags=["evolution"])
 
 
 # ==================== Pydantic Schemas ====================
+# InstanceStatusResponse and SyncResult are only ever filled from our own rows
+# and counters, so routes build them with model_construct() and skip validation.
 
 class InstanceStatusResponse(BaseModel):
     instance_name: str
@@ -34,7 +42,7 @@ class InstanceStatusResponse(BaseModel):
     phone_number: Optional[str] = None
     profile_name: Optional[str] = None
     qr_code: Optional[str] = None
-    last_connected_at: Optional[str] = None
+    last_connected_at: Optional[datetime] = None
     chats_count: Optional[int] = None
 
 
@@ -48,6 +56,10 @@ class SyncResult(BaseModel):
     message: str
 
 
+# Shared reply for syncs that found nothing new (common while reconnecting)
+_EMPTY_SYNC = SyncResult.model_construct(synced_count=0, message="No new items")
+
+
 class SendTextRequest(BaseModel):
     phone_number: str
     text: str
@@ -71,6 +83,8 @@ class FetchChatMessagesRequest(BaseModel):
 
 
 class ContactInfo(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     wa_id: str
     name: Optional[str] = None
@@ -78,13 +92,179 @@ class ContactInfo(BaseModel):
     evolution_remote_jid: Optional[str] = None
 
 
+class ContactListResponse(BaseModel):
+    contacts: List[ContactInfo]
+    total: int
+
+
+class MessageInfo(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    type: Optional[str] = None
+    content: Optional[str] = None
+    is_outbound: Optional[bool] = None
+    status: Optional[str] = None
+    timestamp: Optional[datetime] = None
+    source: Optional[str] = None
+
+
+class ContactMessagesResponse(BaseModel):
+    messages: List[MessageInfo]
+    contact: ContactInfo
+
+
 # ==================== Helper Functions ====================
 
+# Column projections for the read endpoints, so list queries don't hydrate
+# full ORM objects just to copy a few fields out
+CONTACT_INFO_COLUMNS = (
+    Contact.id,
+    Contact.wa_id,
+    Contact.name,
+    Contact.profile_name,
+    Contact.evolution_remote_jid,
+)
+
+@dataclass(frozen=True)
+class InstanceSnapshot:
+    """Session-independent copy of the instance fields the routes read."""
+    id: int
+    instance_name: str
+    status: str
+    phone_number: Optional[str]
+    profile_name: Optional[str]
+    last_connected_at: Optional[datetime]
+    chats_count: Optional[int]
+    has_qr_code: bool
+
+
+# Waits before each connect attempt in create_instance; ~1s in total, which
+# is what a fresh instance used to be given up front
+QR_POLL_DELAYS = (0.05, 0.1, 0.2, 0.3, 0.4)
+QR_POLL_TIMEOUT = 2.0
+
+# user_id -> InstanceSnapshot (None when the user has no instance yet).
+# Snapshots rather than ORM objects, since those are bound to their session.
+_instance_cache: TTLCache = TTLCache(maxsize=10_000, ttl=30)
+_instance_cache_lock = threading.Lock()
+
+# user_ids whose state was checked against Evolution in the last few seconds;
+# within that window a status poll with a matching ETag skips the API call
+STATUS_FRESH_SECONDS = 5
+_status_checked: TTLCache = TTLCache(maxsize=10_000, ttl=STATUS_FRESH_SECONDS)
+
+
+@functools.lru_cache(maxsize=10_000)
 def get_user_instance_name(user_id: int) -> str:
     """Generate instance name for user."""
     return f"user_{user_id}"
 
 
+def get_cached_instance(db: Session, user_id: int) -> Optional[InstanceSnapshot]:
+    """Get the user's instance, served from a short-lived in-process cache."""
+    with _instance_cache_lock:
+        hit = user_id in _instance_cache
+        snapshot = _instance_cache.get(user_id)
+
+    if hit:
+        return snapshot
+
+    row = db.query(
+        EvolutionInstance.id,
+        EvolutionInstance.instance_name,
+        EvolutionInstance.status,
+        EvolutionInstance.phone_number,
+        EvolutionInstance.profile_name,
+        EvolutionInstance.last_connected_at,
+        EvolutionInstance.chats_count,
+        EvolutionInstance.qr_code.isnot(None).label("has_qr_code")
+    ).filter(
+        EvolutionInstance.user_id == user_id
+    ).first()
+    snapshot = InstanceSnapshot(**row._mapping) if row else None
+
+    with _instance_cache_lock:
+        _instance_cache[user_id] = snapshot
+    return snapshot
+
+
+def invalidate_cached_instance(user_id: int) -> None:
+    """Drop the cached instance; call after committing any change to it."""
+    with _instance_cache_lock:
+        _instance_cache.pop(user_id, None)
+
+
+def instance_status_etag(
+    status: str,
+    phone_number: Optional[str],
+    profile_name: Optional[str],
+    last_connected_at: Optional[datetime],
+    chats_count: Optional[int]
+) -> str:
+    """ETag over the fields of an InstanceStatusResponse."""
+    key = f"{status}:{phone_number}:{profile_name}:{last_connected_at}:{chats_count}"
+    return '"%s"' % hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+
+
+def instance_status_response(
+    instance,
+    status: str,
+    *,
+    qr_code: Optional[str] = None,
+    last_connected_at: Optional[datetime] = None
+) -> InstanceStatusResponse:
+    """Status response for an instance row or snapshot, with the given status."""
+    return InstanceStatusResponse.model_construct(
+        instance_name=instance.instance_name,
+        status=status,
+        phone_number=instance.phone_number,
+        profile_name=instance.profile_name,
+        qr_code=qr_code,
+        last_connected_at=last_connected_at or instance.last_connected_at,
+        chats_count=instance.chats_count
+    )
+
+
+def require_connected_instance(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> InstanceSnapshot:
+    """Dependency: the current user's instance, or 400 if it isn't connected."""
+    instance = get_cached_instance(db, current_user.id)
+
+    if not instance or instance.status != "connected":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="WhatsApp not connected. Please scan QR code first."
+        )
+    return instance
+
+
+def update_instance(db: Session, instance: InstanceSnapshot, user_id: int, **values) -> None:
+    """Write the given columns by primary key, commit and invalidate the cache."""
+    db.execute(
+        update(EvolutionInstance).where(EvolutionInstance.id == instance.id).values(**values)
+    )
+    db.commit()
+    invalidate_cached_instance(user_id)
+
+
+def persist_instance(instance_id: int, user_id: int, **values) -> None:
+    """Background task: write the given columns in a session of its own."""
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(EvolutionInstance).where(EvolutionInstance.id == instance_id).values(**values)
+        )
+        db.commit()
+        invalidate_cached_instance(user_id)
+    except Exception as e:
+        logger.error(f"Failed to persist instance {instance_id}: {e}")
+    finally:
+        db.close()
+
+
 async def get_or_create_instance(
     db: Session,
     user: User
@@ -103,6 +283,7 @@ async def get_or_create_instance(
         db.add(instance)
         db.commit()
         db.refresh(instance)
+        invalidate_cached_instance(user.id)
 
     return instance
 
@@ -111,6 +292,7 @@ async def get_or_create_instance(
 
 @router.post("/instance/create", response_model=InstanceStatusResponse)
 async def create_instance(
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -123,55 +305,66 @@ async def create_instance(
     instance = await get_or_create_instance(db, current_user)
 
     try:
-        # Try to get current status first
-        try:
-            status_response = await evolution_service.get_instance_status(instance.instance_name)
-            state = status_response.get("state", "close")
-
-            if state == "open":
-                instance.status = "connected"
-                db.commit()
-                return InstanceStatusResponse(
-                    instance_name=instance.instance_name,
-                    status="connected",
-                    phone_number=instance.phone_number,
-                    profile_name=instance.profile_name,
-                    last_connected_at=instance.last_connected_at.isoformat() if instance.last_connected_at else None,
-                    chats_count=instance.chats_count
-                )
-        except EvolutionAPIError:
-            # Instance doesn't exist in Evolution, we'll create it
-            pass
-
-        # Create new instance (QR typically not in create response for v2)
-        try:
-            await evolution_service.create_instance(instance.instance_name)
-        except EvolutionAPIError as e:
-            # 403 = instance already exists, that's fine
-            if e.status_code != 403:
-                raise
-
-        # Get QR code via connect endpoint (reliable in Evolution API v2)
-        await asyncio.sleep(1)  # Brief pause for instance initialization
+        # Ask for the status and a QR at once: an instance that already exists
+        # but is disconnected (the common case) then needs no further call.
+        # API errors here mean the instance doesn't exist in Evolution yet.
+        status_response, connect_response = await asyncio.gather(
+            evolution_service.get_instance_status(instance.instance_name),
+            evolution_service.connect_instance(instance.instance_name),
+            return_exceptions=True
+        )
+        for result in (status_response, connect_response):
+            if isinstance(result, Exception) and not isinstance(result, EvolutionAPIError):
+                raise result
+
+        if not isinstance(status_response, Exception) and status_response.get("state", "close") == "open":
+            instance.status = "connected"
+            db.commit()
+            invalidate_cached_instance(current_user.id)
+            return instance_status_response(instance, "connected")
 
         qr_code = None
-        try:
-            connect_response = await evolution_service.connect_instance(instance.instance_name)
+        if not isinstance(connect_response, Exception):
             qr_code = connect_response.get("base64")
-        except EvolutionAPIError:
-            logger.warning(f"Failed to get QR from connect for {instance.instance_name}")
 
-        instance.status = "qr" if qr_code else "connecting"
-        instance.qr_code = qr_code
-        instance.qr_code_updated_at = datetime.utcnow() if qr_code else None
-        db.commit()
+        if not qr_code:
+            # Create new instance (QR typically not in create response for v2)
+            try:
+                await evolution_service.create_instance(instance.instance_name)
+            except EvolutionAPIError as e:
+                # 403 = instance already exists, that's fine
+                if e.status_code != 403:
+                    raise
+
+            # Get QR code via connect endpoint (reliable in Evolution API v2),
+            # retrying with backoff while the new instance initializes
+            try:
+                async with asyncio.timeout(QR_POLL_TIMEOUT):
+                    for delay in QR_POLL_DELAYS:
+                        await asyncio.sleep(delay)
+                        try:
+                            connect_response = await evolution_service.connect_instance(instance.instance_name)
+                        except EvolutionAPIError:
+                            continue
+                        qr_code = connect_response.get("base64")
+                        if qr_code:
+                            break
+            except TimeoutError:
+                pass
 
-        return InstanceStatusResponse(
-            instance_name=instance.instance_name,
-            status=instance.status,
-            qr_code=qr_code
+        if not qr_code:
+            logger.warning(f"Failed to get QR from connect for {instance.instance_name}")
+
+        new_status = "qr" if qr_code else "connecting"
+        background_tasks.add_task(
+            persist_instance, instance.id, current_user.id,
+            status=new_status,
+            qr_code=qr_code,
+            qr_code_updated_at=utc_now() if qr_code else None,
         )
 
+        return instance_status_response(instance, new_status, qr_code=qr_code)
+
     except EvolutionAPIError as e:
         logger.error(f"Evolution API error: {e.message}")
         raise HTTPException(
@@ -182,6 +375,9 @@ async def create_instance(
 
 @router.get("/instance/status", response_model=InstanceStatusResponse)
 async def get_instance_status(
+    request: Request,
+    response: Response,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -190,51 +386,78 @@ async def get_instance_status(
 
     This endpoint only checks connectionState — it does NOT generate new QR codes.
     The cached QR from the DB is returned if still in "qr" state.
+
+    Responses carry an ETag; a poll sending it back in If-None-Match gets a
+    304 without another Evolution call if the state was checked recently.
     """
-    instance = db.query(EvolutionInstance).filter(
-        EvolutionInstance.user_id == current_user.id
-    ).first()
+    instance = get_cached_instance(db, current_user.id)
 
     if not instance:
-        return InstanceStatusResponse(
+        return InstanceStatusResponse.model_construct(
             instance_name=get_user_instance_name(current_user.id),
             status="disconnected"
         )
 
+    etag = instance_status_etag(
+        instance.status, instance.phone_number, instance.profile_name,
+        instance.last_connected_at, instance.chats_count
+    )
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")):
+        with _instance_cache_lock:
+            fresh = current_user.id in _status_checked
+        if fresh:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
     try:
-        status_response = await evolution_service.get_instance_status(instance.instance_name)
+        status_response = await evolution_service.get_instance_status(
+            instance.instance_name, cached=True
+        )
         state = status_response.get("state", "close")
 
         # Map Evolution states to our states
+        last_connected_at = instance.last_connected_at
+        changes = {}
         if state == "open":
-            instance.status = "connected"
-            instance.last_connected_at = datetime.utcnow()
-            instance.qr_code = None
+            new_status = "connected"
+            if instance.status != new_status:
+                # Also returned in the response, so a Python value rather
+                # than utc_now(); naive UTC like the column
+                last_connected_at = datetime.now(timezone.utc).replace(tzinfo=None)
+                changes["last_connected_at"] = last_connected_at
         elif state == "connecting":
             # Instance exists and is waiting for QR scan.
             # Return "connecting" so frontend knows polling should continue.
             # Don't return cached QR — frontend fetches fresh QR separately.
-            instance.status = "connecting"
+            new_status = "connecting"
         else:
             # close / unknown = disconnected
-            instance.status = "disconnected"
-            instance.qr_code = None
+            new_status = "disconnected"
 
-        db.commit()
+        if new_status != instance.status:
+            changes["status"] = new_status
+        if new_status != "connecting" and instance.has_qr_code:
+            changes["qr_code"] = None
 
-        return InstanceStatusResponse(
-            instance_name=instance.instance_name,
-            status=instance.status,
-            phone_number=instance.phone_number,
-            profile_name=instance.profile_name,
-            qr_code=instance.qr_code if instance.status == "qr" else None,
-            last_connected_at=instance.last_connected_at.isoformat() if instance.last_connected_at else None,
-            chats_count=instance.chats_count
+        # Most polls see the same state again; only write when something moved,
+        # and do it after the response so the poll doesn't wait on the commit
+        if changes:
+            background_tasks.add_task(persist_instance, instance.id, current_user.id, **changes)
+
+        with _instance_cache_lock:
+            _status_checked[current_user.id] = True
+        response.headers["ETag"] = instance_status_etag(
+            new_status, instance.phone_number, instance.profile_name,
+            last_connected_at, instance.chats_count
+        )
+
+        return instance_status_response(
+            instance, new_status, last_connected_at=last_connected_at
         )
 
     except EvolutionAPIError as e:
         # Instance might not exist in Evolution
-        return InstanceStatusResponse(
+        return InstanceStatusResponse.model_construct(
             instance_name=instance.instance_name,
             status="disconnected",
             chats_count=instance.chats_count
@@ -247,9 +470,7 @@ async def get_qrcode(
     db: Session = Depends(get_db)
 ):
     """Get or refresh QR code for WhatsApp connection."""
-    instance = db.query(EvolutionInstance).filter(
-        EvolutionInstance.user_id == current_user.id
-    ).first()
+    instance = get_cached_instance(db, current_user.id)
 
     if not instance:
         raise HTTPException(
@@ -279,10 +500,10 @@ async def get_qrcode(
                 detail="QR code not available. Try creating a new instance."
             )
 
-        instance.qr_code = qr_code
-        instance.qr_code_updated_at = datetime.utcnow()
-        instance.status = "qr"
-        db.commit()
+        update_instance(
+            db, instance, current_user.id,
+            qr_code=qr_code, qr_code_updated_at=utc_now(), status="qr"
+        )
 
         return QRCodeResponse(
             qr_code=qr_code,
@@ -304,9 +525,7 @@ async def disconnect_instance(
     db: Session = Depends(get_db)
 ):
     """Disconnect WhatsApp instance (logout and delete from Evolution)."""
-    instance = db.query(EvolutionInstance).filter(
-        EvolutionInstance.user_id == current_user.id
-    ).first()
+    instance = get_cached_instance(db, current_user.id)
 
     if not instance:
         raise HTTPException(
@@ -315,28 +534,25 @@ async def disconnect_instance(
         )
 
     try:
-        # Try logout first, then delete to clean up fully
-        try:
-            await evolution_service.logout_instance(instance.instance_name)
-        except EvolutionAPIError:
-            pass
-        try:
-            await evolution_service.delete_instance(instance.instance_name)
-        except EvolutionAPIError:
-            pass
+        # Logout and delete are independent calls (delete also works on a
+        # logged-in instance), so issue both at once; API errors are ignored
+        results = await asyncio.gather(
+            evolution_service.logout_instance(instance.instance_name),
+            evolution_service.delete_instance(instance.instance_name),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception) and not isinstance(result, EvolutionAPIError):
+                raise result
 
-        instance.status = "disconnected"
-        instance.qr_code = None
-        db.commit()
+        update_instance(db, instance, current_user.id, status="disconnected", qr_code=None)
 
         return {"message": "Successfully disconnected"}
 
     except Exception as e:
         logger.error(f"Disconnect error: {e}")
         # Still reset local status even if Evolution API fails
-        instance.status = "disconnected"
-        instance.qr_code = None
-        db.commit()
+        update_instance(db, instance, current_user.id, status="disconnected", qr_code=None)
         return {"message": "Disconnected (with warnings)"}
 
 
@@ -344,20 +560,9 @@ async def disconnect_instance(
 
 @router.get("/chats/raw")
 async def get_chats_raw(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    instance: InstanceSnapshot = Depends(require_connected_instance)
 ):
     """Get raw chat list from Evolution API. Returns the API response as-is."""
-    instance = db.query(EvolutionInstance).filter(
-        EvolutionInstance.user_id == current_user.id
-    ).first()
-
-    if not instance or instance.status != "connected":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="WhatsApp not connected"
-        )
-
     try:
         chats = await evolution_service.fetch_chats(instance.instance_name)
         return {"raw": chats}
@@ -371,24 +576,13 @@ async def get_chats_raw(
 @router.post("/chats/messages/raw")
 async def get_chat_messages_raw(
     request: FetchChatMessagesRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    instance: InstanceSnapshot = Depends(require_connected_instance)
 ):
     """
     Fetch messages for a specific chat by remoteJid.
     Returns the raw Evolution API response.
     No need to sync contacts first.
     """
-    instance = db.query(EvolutionInstance).filter(
-        EvolutionInstance.user_id == current_user.id
-    ).first()
-
-    if not instance or instance.status != "connected":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="WhatsApp not connected"
-        )
-
     try:
         messages = await evolution_service.fetch_messages(
             instance.instance_name,
@@ -405,34 +599,24 @@ async def get_chat_messages_raw(
 
 @router.post("/sync/contacts", response_model=SyncResult)
 async def sync_contacts(
+    instance: InstanceSnapshot = Depends(require_connected_instance),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Synchronize all contacts from WhatsApp."""
-    instance = db.query(EvolutionInstance).filter(
-        EvolutionInstance.user_id == current_user.id
-    ).first()
-
-    if not instance or instance.status != "connected":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="WhatsApp not connected. Please scan QR code first."
-        )
-
     try:
         contacts = await evolution_service.fetch_contacts(instance.instance_name)
-        synced_count = 0
 
-        for contact_data in contacts:
-            # Skip group chats
-            remote_jid = contact_data.get("id", contact_data.get("remoteJid", ""))
-            if "@g.us" in remote_jid:
-                continue
+        # Skip group chats
+        contacts = [
+            c for c in contacts
+            if not c.get("id", c.get("remoteJid", "")).endswith("@g.us")
+        ]
+        synced_count = len(evolution_service.sync_contacts_to_db(db, contacts, current_user.id))
+        if synced_count == 0:
+            return _EMPTY_SYNC
 
-            evolution_service.sync_contact_to_db(db, contact_data, current_user.id)
-            synced_count += 1
-
-        return SyncResult(
+        return SyncResult.model_construct(
             synced_count=synced_count,
             message=f"Successfully synced {synced_count} contacts"
         )
@@ -446,20 +630,11 @@ async def sync_contacts(
 
 @router.post("/sync/chats")
 async def sync_chats(
+    instance: InstanceSnapshot = Depends(require_connected_instance),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get list of available chats from WhatsApp."""
-    instance = db.query(EvolutionInstance).filter(
-        EvolutionInstance.user_id == current_user.id
-    ).first()
-
-    if not instance or instance.status != "connected":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="WhatsApp not connected. Please scan QR code first."
-        )
-
     try:
         chats = await evolution_service.fetch_chats(instance.instance_name)
 
@@ -467,7 +642,7 @@ async def sync_chats(
         for chat in chats:
             remote_jid = chat.get("remoteJid") or ""
 
-            if "@g.us" in remote_jid:
+            if remote_jid.endswith("@g.us"):
                 continue
 
             chat_list.append({
@@ -477,8 +652,7 @@ async def sync_chats(
                 "last_message_time": chat.get("lastMessageTime")
             })
 
-        instance.chats_count = len(chat_list)
-        db.commit()
+        update_instance(db, instance, current_user.id, chats_count=len(chat_list))
 
         return {"chats": chat_list, "total": len(chat_list)}
 
@@ -489,10 +663,52 @@ async def sync_chats(
         )
 
 
+def _contact_ids_by_remote_jid(db: Session, user_id: int) -> dict:
+    """Contact ID per remote JID for the user's contacts synced from WhatsApp."""
+    return dict(db.query(Contact.evolution_remote_jid, Contact.id).filter(
+        Contact.user_id == user_id,
+        Contact.evolution_remote_jid.isnot(None)
+    ).all())
+
+
+@router.post("/sync/messages", response_model=SyncResult)
+async def sync_all_messages(
+    limit: int = 30,
+    instance: InstanceSnapshot = Depends(require_connected_instance),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Sync message history for every contact synced from WhatsApp.
+
+    Args:
+        limit: Maximum messages to sync per contact (default: 30)
+    """
+    # Sync Session I/O stays off the event loop, as in sync_all_chats' writer
+    contact_ids = await asyncio.to_thread(_contact_ids_by_remote_jid, db, current_user.id)
+    if not contact_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No contacts with an Evolution remote JID. Sync contacts first."
+        )
+
+    synced_count = await evolution_service.sync_all_chats(
+        db, instance.instance_name, current_user.id, contact_ids, limit=limit
+    )
+    if synced_count == 0:
+        return _EMPTY_SYNC
+
+    return SyncResult.model_construct(
+        synced_count=synced_count,
+        message=f"Successfully synced {synced_count} new messages from {len(contact_ids)} chats"
+    )
+
+
 @router.post("/sync/messages/{contact_id}", response_model=SyncResult)
 async def sync_messages(
     contact_id: int,
     limit: int = 30,
+    instance: InstanceSnapshot = Depends(require_connected_instance),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -503,23 +719,10 @@ async def sync_messages(
         contact_id: Contact ID in our database
         limit: Maximum messages to sync (default: 30)
     """
-    instance = db.query(EvolutionInstance).filter(
-        EvolutionInstance.user_id == current_user.id
-    ).first()
+    # Get contact by primary key (served from the identity map if loaded)
+    contact = db.get(Contact, contact_id)
 
-    if not instance or instance.status != "connected":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="WhatsApp not connected. Please scan QR code first."
-        )
-
-    # Get contact
-    contact = db.query(Contact).filter(
-        Contact.id == contact_id,
-        Contact.user_id == current_user.id
-    ).first()
-
-    if not contact:
+    if not contact or contact.user_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Contact not found"
@@ -541,8 +744,10 @@ async def sync_messages(
         synced_count = evolution_service.sync_chat_history(
             db, messages, current_user.id, contact_id
         )
+        if synced_count == 0:
+            return _EMPTY_SYNC
 
-        return SyncResult(
+        return SyncResult.model_construct(
             synced_count=synced_count,
             message=f"Successfully synced {synced_count} new messages"
         )
@@ -559,20 +764,9 @@ async def sync_messages(
 @router.post("/send/text", response_model=SendTextResponse)
 async def send_text_message(
     request: SendTextRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    instance: InstanceSnapshot = Depends(require_connected_instance)
 ):
     """Send a text message via WhatsApp."""
-    instance = db.query(EvolutionInstance).filter(
-        EvolutionInstance.user_id == current_user.id
-    ).first()
-
-    if not instance or instance.status != "connected":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="WhatsApp not connected. Please scan QR code first."
-        )
-
     try:
         response = await evolution_service.send_text_message(
             instance.instance_name,
@@ -596,7 +790,7 @@ async def send_text_message(
 
 # ==================== Data Endpoints ====================
 
-@router.get("/contacts")
+@router.get("/contacts", response_model=ContactListResponse)
 async def get_user_contacts(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -604,25 +798,21 @@ async def get_user_contacts(
     limit: int = 100
 ):
     """Get contacts for current user."""
-    contacts = db.query(Contact).filter(
+    contacts = db.query(*CONTACT_INFO_COLUMNS).filter(
         Contact.user_id == current_user.id
     ).offset(skip).limit(limit).all()
+    # Total across all pages, not just this one
+    total = db.query(func.count(Contact.id)).filter(
+        Contact.user_id == current_user.id
+    ).scalar()
 
     return {
-        "contacts": [
-            ContactInfo(
-                id=c.id,
-                wa_id=c.wa_id,
-                name=c.name,
-                profile_name=c.profile_name,
-                evolution_remote_jid=c.evolution_remote_jid
-            ) for c in contacts
-        ],
-        "total": len(contacts)
+        "contacts": contacts,
+        "total": total
     }
 
 
-@router.get("/messages/{contact_id}")
+@router.get("/messages/{contact_id}", response_model=ContactMessagesResponse)
 async def get_contact_messages(
     contact_id: int,
     current_user: User = Depends(get_current_user),
@@ -632,7 +822,7 @@ async def get_contact_messages(
 ):
     """Get messages for a specific contact."""
     # Verify contact belongs to user
-    contact = db.query(Contact).filter(
+    contact = db.query(*CONTACT_INFO_COLUMNS).filter(
         Contact.id == contact_id,
         Contact.user_id == current_user.id
     ).first()
@@ -643,28 +833,18 @@ async def get_contact_messages(
             detail="Contact not found"
         )
 
-    messages = db.query(Message).filter(
+    messages = db.query(
+        Message.id,
+        Message.message_type.label("type"),
+        Message.content,
+        Message.is_outbound,
+        Message.status,
+        Message.timestamp,
+        Message.source
+    ).filter(
         Message.contact_id == contact_id,
         Message.user_id == current_user.id
     ).order_by(Message.timestamp.desc()).offset(skip).limit(limit).all()
 
-    return {
-        "messages": [
-            {
-                "id": m.id,
-                "type": m.message_type,
-                "content": m.content,
-                "is_outbound": m.is_outbound,
-                "status": m.status,
-                "timestamp": m.timestamp.isoformat() if m.timestamp else None,
-                "source": m.source
-            } for m in messages
-        ],
-        "contact": ContactInfo(
-            id=contact.id,
-            wa_id=contact.wa_id,
-            name=contact.name,
-            profile_name=contact.profile_name,
-            evolution_remote_jid=contact.evolution_remote_jid
-        )
-    }
+    # Rows are serialized straight from the response model
+    return {"messages": messages, "contact": contact}
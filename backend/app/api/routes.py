@@ -1,29 +1,112 @@
-import asyncio
 import logging
+import threading
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from cachetools import TTLCache
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import func, select, tuple_
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Awaitable, Callable, List, Optional
 
-from app.core.database import get_db, SessionLocal
-from app.core.config import settings
+from app.core.database import get_db
 from app.services.whatsapp import whatsapp_service
 from app.models.whatsapp import Message, Contact, Conversation
-from app.models.evolution import EvolutionInstance
-from app.services.evolution import evolution_service, EvolutionAPIError
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
+# ==================== Pydantic Schemas ====================
+# Response models let FastAPI serialize rows straight to JSON in Pydantic,
+# datetimes included, instead of building dicts by hand
+
+class MessageItem(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    wa_message_id: Optional[str] = None
+    type: Optional[str] = None
+    content: Optional[str] = None
+    is_outbound: Optional[bool] = None
+    timestamp: Optional[datetime] = None
+    contact_id: Optional[int] = None
+
+
+class MessageListResponse(BaseModel):
+    messages: List[MessageItem]
+    # Pass back as before_ts/before_id for the next page; None on the last page
+    next_before_ts: Optional[datetime] = None
+    next_before_id: Optional[int] = None
+
+
+class ContactItem(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    wa_id: Optional[str] = None
+    name: Optional[str] = None
+    profile_name: Optional[str] = None
+    created_at: datetime
+
+
+class ContactListResponse(BaseModel):
+    contacts: List[ContactItem]
+    next_after_id: Optional[int] = None
+
+
+class ConversationItem(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    contact_id: Optional[int] = None
+    started_at: datetime
+    last_message_at: Optional[datetime] = None
+    is_active: Optional[bool] = None
+
+
+class ConversationListResponse(BaseModel):
+    conversations: List[ConversationItem]
+    next_after_id: Optional[int] = None
+
+
+class StatsResponse(BaseModel):
+    total_messages: int
+    total_contacts: int
+    total_conversations: int
+    inbound_messages: int
+    outbound_messages: int
+
+
 @router.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "ok"}
 
 
+# Business profile, phone numbers and templates change rarely; caching them
+# briefly saves a Graph API round-trip on every dashboard load
+GRAPH_TTL_SECONDS = 300
+_graph_cache: TTLCache = TTLCache(maxsize=8, ttl=GRAPH_TTL_SECONDS)
+_graph_cache_lock = threading.Lock()
+
+
+async def cached_graph_call(key: str, fetch: Callable[[], Awaitable[dict]]) -> dict:
+    """Return fetch()'s result, reusing it for GRAPH_TTL_SECONDS"""
+    with _graph_cache_lock:
+        cached = _graph_cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = await fetch()
+    # Graph reports failures in the body; don't pin those for the whole TTL
+    if "error" not in result:
+        with _graph_cache_lock:
+            _graph_cache[key] = result
+    return result
+
+
 @router.get("/whatsapp/verify")
 async def verify_whatsapp_token():
     """Verify that the WhatsApp access token is valid"""
@@ -38,7 +121,7 @@ async def verify_whatsapp_token():
 async def get_business_profile():
     """Get WhatsApp Business Profile"""
     try:
-        result = await whatsapp_service.get_business_profile()
+        result = await cached_graph_call("profile", whatsapp_service.get_business_profile)
         return result
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -48,7 +131,7 @@ async def get_business_profile():
 async def get_phone_numbers():
     """Get all phone numbers associated with the business account"""
     try:
-        result = await whatsapp_service.get_phone_numbers()
+        result = await cached_graph_call("phone_numbers", whatsapp_service.get_phone_numbers)
         return result
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -58,262 +141,137 @@ async def get_phone_numbers():
 async def get_message_templates():
     """Get all message templates"""
     try:
-        result = await whatsapp_service.get_message_templates()
+        result = await cached_graph_call("templates", whatsapp_service.get_message_templates)
         return result
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
-# Webhook endpoints for receiving messages
-@router.get("/webhook")
-async def verify_webhook(
-    hub_mode: str = Query(None, alias="hub.mode"),
-    hub_verify_token: str = Query(None, alias="hub.verify_token"),
-    hub_challenge: str = Query(None, alias="hub.challenge")
-):
-    """Webhook verification endpoint for WhatsApp"""
-    if hub_mode == "subscribe" and hub_verify_token == settings.wa_verify_token:
-        return int(hub_challenge)
-    raise HTTPException(status_code=403, detail="Verification failed")
-
-
-@router.post("/webhook")
-async def receive_webhook(request: Request, db: Session = Depends(get_db)):
-    """Receive incoming WhatsApp messages"""
-    try:
-        data = await request.json()
-
-        # Process and save the message
-        message = whatsapp_service.save_incoming_message(db, data)
+# Data endpoints
 
-        if message:
-            return {"status": "ok", "message_id": message.id}
-        return {"status": "ok", "message": "No message to process"}
+# Pages are materialized in full before serialization; the cap bounds that
+# memory, and keyset cursors make walking many small pages cheap
+MAX_PAGE_SIZE = 500
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
 
-
-# Data endpoints
-@router.get("/messages")
-async def get_messages(
+@router.get("/messages", response_model=MessageListResponse)
+def get_messages(
     db: Session = Depends(get_db),
     skip: int = 0,
-    limit: int = 100,
-    contact_id: Optional[int] = None
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    contact_id: Optional[int] = None,
+    before_ts: Optional[datetime] = None,
+    before_id: Optional[int] = None
 ):
-    """Get all saved messages"""
-    query = db.query(Message)
+    """
+    Get all saved messages, newest first.
+
+    Page with the returned next_before_ts/next_before_id (keyset pagination):
+    each page costs the same however deep it is, unlike a growing skip.
+    """
+    # Half a cursor would silently restart from the newest page
+    if (before_ts is None) != (before_id is None):
+        raise HTTPException(status_code=422, detail="before_ts and before_id must be given together")
+
+    query = db.query(
+        Message.id,
+        Message.wa_message_id,
+        Message.message_type.label("type"),
+        Message.content,
+        Message.is_outbound,
+        Message.timestamp,
+        Message.contact_id
+    )
     if contact_id:
         query = query.filter(Message.contact_id == contact_id)
-    messages = query.order_by(Message.timestamp.desc()).offset(skip).limit(limit).all()
-    return {"messages": [
-        {
-            "id": m.id,
-            "wa_message_id": m.wa_message_id,
-            "type": m.message_type,
-            "content": m.content,
-            "is_outbound": m.is_outbound,
-            "timestamp": m.timestamp.isoformat() if m.timestamp else None,
-            "contact_id": m.contact_id
-        } for m in messages
-    ]}
-
-
-@router.get("/contacts")
-async def get_contacts(db: Session = Depends(get_db), skip: int = 0, limit: int = 100):
-    """Get all contacts"""
-    contacts = db.query(Contact).offset(skip).limit(limit).all()
-    return {"contacts": [
-        {
-            "id": c.id,
-            "wa_id": c.wa_id,
-            "name": c.name,
-            "profile_name": c.profile_name,
-            "created_at": c.created_at.isoformat()
-        } for c in contacts
-    ]}
-
-
-@router.get("/conversations")
-async def get_conversations(db: Session = Depends(get_db), skip: int = 0, limit: int = 100):
-    """Get all conversations"""
-    conversations = db.query(Conversation).offset(skip).limit(limit).all()
-    return {"conversations": [
-        {
-            "id": c.id,
-            "contact_id": c.contact_id,
-            "started_at": c.started_at.isoformat(),
-            "last_message_at": c.last_message_at.isoformat() if c.last_message_at else None,
-            "is_active": c.is_active
-        } for c in conversations
-    ]}
-
-
-@router.get("/stats")
-async def get_stats(db: Session = Depends(get_db)):
-    """Get statistics about stored data"""
+    if before_ts is not None:
+        query = query.filter(tuple_(Message.timestamp, Message.id) < (before_ts, before_id))
+    messages = query.order_by(
+        Message.timestamp.desc(), Message.id.desc()
+    ).offset(skip).limit(limit).all()
+
+    if len(messages) < limit:
+        return {"messages": messages}
     return {
-        "total_messages": db.query(Message).count(),
-        "total_contacts": db.query(Contact).count(),
-        "total_conversations": db.query(Conversation).count(),
-        "inbound_messages": db.query(Message).filter(Message.is_outbound == False).count(),
-        "outbound_messages": db.query(Message).filter(Message.is_outbound == True).count()
+        "messages": messages,
+        "next_before_ts": messages[-1].timestamp,
+        "next_before_id": messages[-1].id,
     }
 
 
-# ==================== Evolution API Webhook ====================
-
-@router.post("/webhook/evolution")
-async def evolution_webhook(request: Request, db: Session = Depends(get_db)):
-    """
-    Webhook for Evolution API events.
-
-    Handles:
-    - messages.upsert: New incoming/outgoing message
-    - connection.update: Connection state changes (connected/disconnected)
-    - qrcode.updated: QR code refresh
-    """
-    try:
-        data = await request.json()
-        event = data.get("event")
-        instance_name = data.get("instance")
-
-        logger.info(f"Evolution webhook received: {event} for {instance_name}")
-
-        if not instance_name:
-            return {"status": "ok", "message": "No instance specified"}
-
-        # Find the instance in our database
-        instance = db.query(EvolutionInstance).filter(
-            EvolutionInstance.instance_name == instance_name
-        ).first()
-
-        if not instance:
-            logger.warning(f"Unknown instance: {instance_name}")
-            return {"status": "ok", "message": "Unknown instance"}
-
-        # Handle different event types
-        if event == "connection.update":
-            await handle_connection_update(db, instance, data)
-
-        elif event == "qrcode.updated":
-            await handle_qrcode_update(db, instance, data)
-
-        elif event == "messages.upsert":
-            await handle_message_upsert(db, instance, data)
-
-        return {"status": "ok"}
-
-    except Exception as e:
-        logger.error(f"Evolution webhook error: {e}")
-        return {"status": "error", "message": str(e)}
-
-
-async def handle_connection_update(db: Session, instance: EvolutionInstance, data: dict):
-    """Handle connection state change event."""
-    state_data = data.get("data", {})
-    state = state_data.get("state")
-
-    if state == "open":
-        instance.status = "connected"
-        instance.last_connected_at = datetime.utcnow()
-        instance.chats_count = None
-
-        if "connection" in state_data:
-            conn = state_data["connection"]
-            instance.phone_number = conn.get("wid", {}).get("user")
-            instance.profile_name = conn.get("pushName")
+@router.get("/contacts", response_model=ContactListResponse)
+def get_contacts(
+    db: Session = Depends(get_db),
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after_id: Optional[int] = None
+):
+    """Get all contacts in id order; page with the returned next_after_id"""
+    query = db.query(
+        Contact.id, Contact.wa_id, Contact.name, Contact.profile_name, Contact.created_at
+    )
+    if after_id is not None:
+        query = query.filter(Contact.id > after_id)
+    contacts = query.order_by(Contact.id).offset(skip).limit(limit).all()
+    return {
+        "contacts": contacts,
+        "next_after_id": contacts[-1].id if len(contacts) == limit else None,
+    }
 
-        db.commit()
-        asyncio.create_task(_sync_chats_count(instance.instance_name, instance.id))
 
-    elif state == "close":
-        instance.status = "disconnected"
-        instance.qr_code = None
-        instance.chats_count = None
-        db.commit()
+@router.get("/conversations", response_model=ConversationListResponse)
+def get_conversations(
+    db: Session = Depends(get_db),
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after_id: Optional[int] = None
+):
+    """Get all conversations in id order; page with the returned next_after_id"""
+    query = db.query(
+        Conversation.id,
+        Conversation.contact_id,
+        Conversation.started_at,
+        Conversation.last_message_at,
+        Conversation.is_active
+    )
+    if after_id is not None:
+        query = query.filter(Conversation.id > after_id)
+    conversations = query.order_by(Conversation.id).offset(skip).limit(limit).all()
+    return {
+        "conversations": conversations,
+        "next_after_id": conversations[-1].id if len(conversations) == limit else None,
+    }
 
-    elif state == "connecting":
-        instance.status = "connecting"
-        db.commit()
 
-    logger.info(f"Instance {instance.instance_name} state updated to: {instance.status}")
+# Dashboard counts don't need to be exact to the second
+STATS_TTL_SECONDS = 10
+_stats_cache: TTLCache = TTLCache(maxsize=1, ttl=STATS_TTL_SECONDS)
+_stats_cache_lock = threading.Lock()
 
 
-async def _sync_chats_count(instance_name: str, instance_id: int):
-    """Background task: fetch chats from WA and save count."""
-    await asyncio.sleep(5)
-    db = SessionLocal()
-    try:
-        chats = await evolution_service.fetch_chats(instance_name)
-        count = sum(1 for c in chats if "@g.us" not in (c.get("remoteJid") or ""))
-
-        inst = db.query(EvolutionInstance).filter(EvolutionInstance.id == instance_id).first()
-        if inst:
-            inst.chats_count = count
-            db.commit()
-            logger.info(f"Auto-synced chats count for {instance_name}: {count}")
-    except EvolutionAPIError as e:
-        logger.error(f"Auto-sync chats failed for {instance_name}: {e.message}")
-    except Exception as e:
-        logger.error(f"Auto-sync chats unexpected error for {instance_name}: {e}")
-    finally:
-        db.close()
-
-
-async def handle_qrcode_update(db: Session, instance: EvolutionInstance, data: dict):
-    """Handle QR code update event."""
-    qr_data = data.get("data", {})
-    qr_code = qr_data.get("qrcode", {}).get("base64")
-
-    if qr_code:
-        instance.qr_code = qr_code
-        instance.qr_code_updated_at = datetime.utcnow()
-        instance.status = "qr"
-        db.commit()
-        logger.info(f"QR code updated for instance {instance.instance_name}")
-
-
-async def handle_message_upsert(db: Session, instance: EvolutionInstance, data: dict):
-    """Handle new message event."""
-    messages = data.get("data", [])
-
-    if not isinstance(messages, list):
-        messages = [messages]
-
-    for msg_data in messages:
-        try:
-            key = msg_data.get("key", {})
-            remote_jid = key.get("remoteJid", "")
-
-            # Skip group messages
-            if "@g.us" in remote_jid:
-                continue
-
-            # Find or create contact
-            contact = db.query(Contact).filter(
-                Contact.user_id == instance.user_id,
-                Contact.evolution_remote_jid == remote_jid
-            ).first()
-
-            if not contact:
-                # Create contact on the fly
-                phone = remote_jid.split("@")[0]
-                contact = Contact(
-                    user_id=instance.user_id,
-                    wa_id=phone,
-                    evolution_remote_jid=remote_jid,
-                    profile_name=msg_data.get("pushName")
-                )
-                db.add(contact)
-                db.commit()
-                db.refresh(contact)
-
-            # Sync the message
-            evolution_service.sync_message_to_db(
-                db, msg_data, instance.user_id, contact.id
-            )
-
-        except Exception as e:
-            logger.error(f"Error processing message: {e}")
+@router.get("/stats", response_model=StatsResponse)
+def get_stats(db: Session = Depends(get_db)):
+    """Get statistics about stored data"""
+    with _stats_cache_lock:
+        cached = _stats_cache.get("stats")
+    if cached is not None:
+        return cached
+
+    # One round-trip and a single pass over messages instead of five COUNTs
+    message_counts = select(
+        func.count().label("total_messages"),
+        func.count().filter(Message.is_outbound == False).label("inbound_messages"),
+        func.count().filter(Message.is_outbound == True).label("outbound_messages"),
+    ).select_from(Message).subquery()
+
+    stats = db.execute(select(
+        message_counts.c.total_messages,
+        select(func.count()).select_from(Contact).scalar_subquery().label("total_contacts"),
+        select(func.count()).select_from(Conversation).scalar_subquery().label("total_conversations"),
+        message_counts.c.inbound_messages,
+        message_counts.c.outbound_messages,
+    )).one()
+    stats = dict(stats._mapping)
+    with _stats_cache_lock:
+        _stats_cache["stats"] = stats
+    return stats
@@ -0,0 +1,331 @@
+"""
+Webhook Routes
+
+Inbound webhooks from the WhatsApp Cloud API and from Evolution API. Both
+acknowledge right away and do their DB writes after the response.
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Optional
+
+import orjson
+from cachetools import TTLCache
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal, utc_now
+from app.core.config import settings
+from app.services.whatsapp import whatsapp_service
+from app.models.evolution import EvolutionInstance
+from app.services.evolution import evolution_service, EvolutionAPIError, parse_evolution_message
+from app.api.evolution import invalidate_cached_instance
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+# ==================== Cloud API Webhook ====================
+
+@router.get("/webhook", response_class=PlainTextResponse)
+async def verify_webhook(request: Request):
+    """Webhook verification endpoint for WhatsApp"""
+    # Read the three hub.* params directly: no validation to run, and the
+    # challenge is echoed back verbatim as text rather than JSON-encoded
+    params = request.query_params
+    if params.get("hub.mode") == "subscribe" and params.get("hub.verify_token") == settings.wa_verify_token:
+        return PlainTextResponse(params.get("hub.challenge", ""))
+    raise HTTPException(status_code=403, detail="Verification failed")
+
+
+WEBHOOK_QUEUE_SIZE = 10_000
+WEBHOOK_BATCH_SIZE = 50
+WEBHOOK_BATCH_WAIT = 0.1  # seconds to wait for more events before flushing
+
+# Incoming Cloud API webhooks are acknowledged once queued and saved in
+# batches by the flusher task, one commit per batch instead of per event
+_webhook_queue: Optional[asyncio.Queue] = None
+
+
+def _save_webhook_batch(batch: list):
+    db = SessionLocal()
+    try:
+        whatsapp_service.save_incoming_messages(db, batch)
+    except Exception as e:
+        logger.error(f"Failed to save webhook batch of {len(batch)}: {e}")
+    finally:
+        db.close()
+
+
+def start_webhook_flusher() -> asyncio.Task:
+    """Create the webhook queue and its flusher task; called from the app lifespan."""
+    global _webhook_queue
+    _webhook_queue = asyncio.Queue(maxsize=WEBHOOK_QUEUE_SIZE)
+    return asyncio.create_task(_flush_webhooks(_webhook_queue))
+
+
+async def _flush_webhooks(queue: asyncio.Queue):
+    """Drain the webhook queue and save events in batches."""
+    loop = asyncio.get_running_loop()
+    batch = []
+    try:
+        while True:
+            batch.append(await queue.get())
+            deadline = loop.time() + WEBHOOK_BATCH_WAIT
+            while len(batch) < WEBHOOK_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except TimeoutError:
+                    break
+            pending, batch = batch, []
+            await asyncio.to_thread(_save_webhook_batch, pending)
+    finally:
+        # On shutdown, save whatever is still held in memory
+        while not queue.empty():
+            batch.append(queue.get_nowait())
+        if batch:
+            _save_webhook_batch(batch)
+
+
+@router.post("/webhook")
+async def receive_webhook(request: Request):
+    """Receive incoming WhatsApp messages"""
+    try:
+        data = orjson.loads(await request.body())
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+
+    if _webhook_queue is None:
+        # No lifespan ran (bare TestClient, script), so no flusher to drain
+        # a queue: save this one event before answering instead
+        await asyncio.to_thread(_save_webhook_batch, [data])
+        return {"status": "ok"}
+
+    try:
+        _webhook_queue.put_nowait(data)
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=503, detail="Webhook queue is full, retry later")
+
+    return {"status": "ok"}
+
+
+# ==================== Evolution API Webhook ====================
+
+@router.post("/webhook/evolution")
+async def evolution_webhook(request: Request, background_tasks: BackgroundTasks):
+    """
+    Webhook for Evolution API events.
+
+    Handles:
+    - messages.upsert: New incoming/outgoing message
+    - connection.update: Connection state changes (connected/disconnected)
+    - qrcode.updated: QR code refresh
+
+    The event is acknowledged right away and applied after the response, so
+    Evolution isn't kept waiting on our DB writes.
+    """
+    try:
+        data = orjson.loads(await request.body())
+        event = data.get("event")
+        instance_name = data.get("instance")
+
+        logger.info(f"Evolution webhook received: {event} for {instance_name}")
+
+        if not instance_name:
+            return {"status": "ok", "message": "No instance specified"}
+
+        background_tasks.add_task(process_evolution_event, event, instance_name, data)
+        return {"status": "ok"}
+
+    except Exception as e:
+        logger.error(f"Evolution webhook error: {e}")
+        return {"status": "error", "message": str(e)}
+
+
+# instance_name -> (id, user_id). Neither changes for the life of an instance,
+# so webhook events can skip the lookup; rows are loaded only to be updated.
+_instance_ids: TTLCache = TTLCache(maxsize=10_000, ttl=300)
+_instance_ids_lock = threading.Lock()
+
+
+def get_instance_ids(db: Session, instance_name: str) -> Optional[tuple]:
+    """(id, user_id) of the named instance, or None if it doesn't exist."""
+    with _instance_ids_lock:
+        ids = _instance_ids.get(instance_name)
+    if ids is None:
+        row = db.query(EvolutionInstance.id, EvolutionInstance.user_id).filter(
+            EvolutionInstance.instance_name == instance_name
+        ).first()
+        if row is None:
+            return None
+        ids = tuple(row)
+        with _instance_ids_lock:
+            _instance_ids[instance_name] = ids
+    return ids
+
+
+async def process_evolution_event(event: str, instance_name: str, data: dict):
+    """Background task: apply an Evolution webhook event in a session of its own."""
+    # Session I/O in here and in the handlers goes through asyncio.to_thread:
+    # this runs on the event loop, and a big messages.upsert would stall it
+    db = SessionLocal()
+    try:
+        ids = await asyncio.to_thread(get_instance_ids, db, instance_name)
+
+        if not ids:
+            logger.warning(f"Unknown instance: {instance_name}")
+            return
+        instance_id, user_id = ids
+
+        # Handle different event types
+        if event == "connection.update":
+            await handle_connection_update(db, instance_id, user_id, instance_name, data)
+
+        elif event == "qrcode.updated":
+            await handle_qrcode_update(db, instance_id, user_id, instance_name, data)
+
+        elif event == "messages.upsert":
+            await handle_message_upsert(db, user_id, data)
+
+    except Exception as e:
+        logger.error(f"Evolution webhook error for {instance_name}: {e}")
+    finally:
+        # Returning the connection rolls back its transaction: another round trip
+        await asyncio.to_thread(db.close)
+
+
+def update_instance_row(db: Session, instance_id: int, **values) -> bool:
+    """Apply values to one instance row in a single UPDATE and commit; False if it's gone."""
+    # Core UPDATE ... RETURNING: no SELECT to load the row before changing it
+    updated = db.execute(
+        update(EvolutionInstance)
+        .where(EvolutionInstance.id == instance_id)
+        .values(**values)
+        .returning(EvolutionInstance.id)
+        .execution_options(synchronize_session=False)
+    ).first()
+    db.commit()
+    return updated is not None
+
+
+async def handle_connection_update(
+    db: Session, instance_id: int, user_id: int, instance_name: str, data: dict
+):
+    """Handle connection state change event."""
+    state_data = data.get("data", {})
+    state = state_data.get("state")
+
+    if state == "open":
+        values = {"status": "connected", "last_connected_at": utc_now(), "chats_count": None}
+        if "connection" in state_data:
+            conn = state_data["connection"]
+            values["phone_number"] = conn.get("wid", {}).get("user")
+            values["profile_name"] = conn.get("pushName")
+    elif state == "close":
+        values = {"status": "disconnected", "qr_code": None, "chats_count": None}
+    elif state == "connecting":
+        values = {"status": "connecting"}
+    else:
+        return
+
+    # Evolution just told us the state; don't serve polls the old one
+    evolution_service.invalidate_instance_status(instance_name)
+    if not await asyncio.to_thread(update_instance_row, db, instance_id, **values):
+        return
+    invalidate_cached_instance(user_id)
+    if state == "open":
+        asyncio.create_task(_sync_chats_count(instance_name, instance_id, user_id))
+
+    logger.info(f"Instance {instance_name} state updated to: {values['status']}")
+
+
+async def _sync_chats_count(instance_name: str, instance_id: int, user_id: int):
+    """Background task: fetch chats from WA and save count."""
+    await asyncio.sleep(5)
+    db = SessionLocal()
+    try:
+        chats = await evolution_service.fetch_chats(instance_name)
+        count = sum(1 for c in chats if not (c.get("remoteJid") or "").endswith("@g.us"))
+
+        if await asyncio.to_thread(update_instance_row, db, instance_id, chats_count=count):
+            invalidate_cached_instance(user_id)
+            logger.info(f"Auto-synced chats count for {instance_name}: {count}")
+    except EvolutionAPIError as e:
+        logger.error(f"Auto-sync chats failed for {instance_name}: {e.message}")
+    except Exception as e:
+        logger.error(f"Auto-sync chats unexpected error for {instance_name}: {e}")
+    finally:
+        await asyncio.to_thread(db.close)
+
+
+async def handle_qrcode_update(
+    db: Session, instance_id: int, user_id: int, instance_name: str, data: dict
+):
+    """Handle QR code update event."""
+    qr_data = data.get("data", {})
+    qr_code = qr_data.get("qrcode", {}).get("base64")
+
+    if qr_code and await asyncio.to_thread(
+        update_instance_row, db, instance_id,
+        qr_code=qr_code, qr_code_updated_at=utc_now(), status="qr"
+    ):
+        invalidate_cached_instance(user_id)
+        logger.info(f"QR code updated for instance {instance_name}")
+
+
+async def handle_message_upsert(db: Session, user_id: int, data: dict):
+    """Handle new message event."""
+    messages = data.get("data", [])
+
+    if not isinstance(messages, list):
+        messages = [messages]
+
+    # Skip group messages before any DB work, keeping each message's JID so
+    # it is only dug out of the payload once
+    candidates = []
+    for msg_data in messages:
+        try:
+            remote_jid = msg_data.get("key", {}).get("remoteJid", "")
+        except AttributeError:
+            logger.warning("Skipping malformed message in messages.upsert")
+            continue
+        if not remote_jid.endswith("@g.us"):
+            candidates.append((remote_jid, msg_data))
+    if not candidates:
+        return
+
+    await asyncio.to_thread(_save_upserted_messages, db, user_id, candidates)
+
+
+def _save_upserted_messages(db: Session, user_id: int, candidates: list):
+    """Save messages.upsert messages, given as (remote_jid, message) pairs."""
+    # The whole batch goes in with one contact lookup, one insert per table
+    # and a single commit, instead of a round trip per message
+    try:
+        push_names = {}
+        for remote_jid, msg_data in candidates:
+            push_names.setdefault(remote_jid, msg_data.get("pushName"))
+        contact_ids = evolution_service.contact_ids_by_jid(db, push_names, user_id)
+
+        rows = []
+        for remote_jid, msg_data in candidates:
+            # A message that doesn't parse is skipped, not the whole event
+            try:
+                row = parse_evolution_message(msg_data, user_id, contact_ids[remote_jid])
+            except (AttributeError, TypeError, ValueError) as e:
+                logger.warning(f"Skipping malformed message from {remote_jid}: {e}")
+                continue
+            if row:
+                rows.append(row)
+        evolution_service.sync_messages_to_db(db, rows)
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error processing messages: {e}")
@@ -1,11 +1,19 @@
-from datetime import datetime, timedelta
-from typing import Optional
+import hashlib
+import threading
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Annotated, Optional
 
 import bcrypt
+from cachetools import TTLCache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from pydantic import BaseModel
+from jose import JWTError, jwk, jwt
+from pydantic import AfterValidator, BaseModel, ConfigDict, EmailStr, Field, StringConstraints
+from pydantic.networks import validate_email
+from pydantic_core import PydanticCustomError
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
@@ -14,6 +22,21 @@ from app.models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# jose builds a key object from the raw secret on every encode/decode unless
+# it's handed one; for HMAC that means re-deriving the key each request
+_SIGNING_KEY = jwk.construct(settings.secret_key, settings.algorithm)
+
+# email -> LoginCredentials (None for unknown emails). A hit answers login
+# without touching the database, repeated failed attempts included.
+_login_cache: TTLCache = TTLCache(maxsize=4096, ttl=30)
+_login_cache_lock = threading.Lock()
+
+_CREDENTIALS_EXCEPTION = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
 
 class Token(BaseModel):
     access_token: str
@@ -24,44 +47,84 @@ class TokenData(BaseModel):
     email: Optional[str] = None
 
 
+# The password cap also bounds the work done before hashing
+Password = Annotated[str, Field(max_length=256)]
+
+
 class UserCreate(BaseModel):
-    email: str
-    password: str
-    name: str
+    email: EmailStr
+    password: Annotated[Password, Field(min_length=6)]
+    name: Annotated[str, StringConstraints(strip_whitespace=True, min_length=1, max_length=100)]
+
+
+def _normalize_login_email(email: str) -> str:
+    """Normalize like EmailStr did at registration, so the stored address matches."""
+    try:
+        return validate_email(email)[1]
+    except PydanticCustomError:
+        # Not a valid address, so no account can have it; fail as a bad login
+        return email
 
 
 class UserLogin(BaseModel):
-    email: str
-    password: str
+    email: Annotated[str, Field(max_length=255), AfterValidator(_normalize_login_email)]
+    password: Password
 
 
 class UserResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     email: str
     name: str
     is_active: bool
     created_at: datetime
 
-    class Config:
-        from_attributes = True
 
+# users.password_algo_version values
+PASSWORD_ALGO_BCRYPT = 1         # bcrypt(password), truncated by bcrypt at 72 bytes
+PASSWORD_ALGO_SHA256_BCRYPT = 2  # bcrypt(hex(sha256(password)))
+PASSWORD_ALGO_CURRENT = PASSWORD_ALGO_SHA256_BCRYPT
+
+BCRYPT_ROUNDS = 12
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+def _prehash_password(password: str) -> bytes:
+    # Fixed 64-byte input: no silent truncation, bcrypt cost independent of input size
+    return hashlib.sha256(password.encode('utf-8')).hexdigest().encode('ascii')
+
+
+def verify_password(
+    plain_password: str,
+    hashed_password: str,
+    algo_version: int = PASSWORD_ALGO_CURRENT
+) -> bool:
+    if algo_version == PASSWORD_ALGO_BCRYPT:
+        secret = plain_password.encode('utf-8')[:72]
+    else:
+        secret = _prehash_password(plain_password)
+    return bcrypt.checkpw(secret, hashed_password.encode('utf-8'))
 
 
 def get_password_hash(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return bcrypt.hashpw(
+        _prehash_password(password), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+    ).decode('utf-8')
+
+
+# Checked against when the email is unknown, so a failed login costs one bcrypt
+# verification either way and response time doesn't reveal registered emails
+_DUMMY_HASH = get_password_hash("dummy-password")
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = datetime.now(timezone.utc) + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
+        expire = datetime.now(timezone.utc) + timedelta(minutes=15)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
+    encoded_jwt = jwt.encode(to_encode, _SIGNING_KEY, algorithm=settings.algorithm)
     return encoded_jwt
 
 
@@ -69,34 +132,90 @@ def get_user_by_email(db: Session, email: str) -> Optional[User]:
     return db.query(User).filter(User.email == email).first()
 
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
-    user = get_user_by_email(db, email)
+@dataclass(frozen=True)
+class LoginCredentials:
+    """The users columns login reads; a plain value, safe to cache across sessions."""
+    id: int
+    email: str
+    hashed_password: str
+    password_algo_version: int
+
+
+def get_login_credentials(db: Session, email: str) -> Optional[LoginCredentials]:
+    row = db.execute(
+        select(User.id, User.email, User.hashed_password, User.password_algo_version)
+        .where(User.email == email)
+    ).first()
+    return LoginCredentials(*row) if row else None
+
+
+def cached_login_credentials(db: Session, email: str) -> Optional[LoginCredentials]:
+    """get_login_credentials with a short-lived in-process cache."""
+    with _login_cache_lock:
+        hit = email in _login_cache
+        credentials = _login_cache.get(email)
+    if hit:
+        return credentials
+
+    credentials = get_login_credentials(db, email)
+    with _login_cache_lock:
+        _login_cache[email] = credentials
+    return credentials
+
+
+def invalidate_cached_user(email: str) -> None:
+    with _login_cache_lock:
+        _login_cache.pop(email, None)
+
+
+def _run_hash(hash_pool: Optional[Executor], fn, *args):
+    # Only the bcrypt call goes to the pool; the Session stays on this thread
+    if hash_pool is None:
+        return fn(*args)
+    return hash_pool.submit(fn, *args).result()
+
+
+def authenticate_user(
+    db: Session,
+    email: str,
+    password: str,
+    hash_pool: Optional[Executor] = None
+) -> Optional[LoginCredentials]:
+    """Credentials for email if the password matches, else None; bcrypt runs on hash_pool."""
+    user = cached_login_credentials(db, email)
     if not user:
+        _run_hash(hash_pool, verify_password, password, _DUMMY_HASH)
         return None
-    if not verify_password(password, user.hashed_password):
+    if not _run_hash(
+        hash_pool, verify_password, password, user.hashed_password, user.password_algo_version
+    ):
         return None
+
+    # Lazily upgrade legacy hashes now that we have the plain password
+    if user.password_algo_version != PASSWORD_ALGO_CURRENT:
+        db.execute(update(User).where(User.id == user.id).values(
+            hashed_password=_run_hash(hash_pool, get_password_hash, password),
+            password_algo_version=PASSWORD_ALGO_CURRENT,
+        ))
+        db.commit()
+        invalidate_cached_user(email)
     return user
 
 
-async def get_current_user(
+def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
 ) -> User:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        payload = jwt.decode(token, _SIGNING_KEY, algorithms=[settings.algorithm])
         email: str = payload.get("sub")
         if email is None:
-            raise credentials_exception
+            raise _CREDENTIALS_EXCEPTION
         token_data = TokenData(email=email)
     except JWTError:
-        raise credentials_exception
+        raise _CREDENTIALS_EXCEPTION
 
     user = get_user_by_email(db, email=token_data.email)
     if user is None:
-        raise credentials_exception
+        raise _CREDENTIALS_EXCEPTION
     return user
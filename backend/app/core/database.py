@@ -1,15 +1,44 @@
-from sqlalchemy import create_engine
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, func
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
 
-engine = create_engine(settings.database_url)
+# psycopg 3 prepares statements server-side after a few executions per
+# connection; a long-lived pool keeps those plans warm across requests.
+engine = create_engine(
+    settings.database_url,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_pre_ping=True,
+    pool_recycle=settings.db_pool_recycle,
+    pool_timeout=settings.db_pool_timeout,
+    connect_args={"options": f"-c statement_timeout={settings.db_statement_timeout_ms}"},
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 
+def utc_now():
+    """Current UTC time as SQL, for naive DateTime columns set by Postgres"""
+    # Evaluated server-side, so column defaults and bulk writes don't carry
+    # a Python clock value and agree with the commit's own clock
+    return func.timezone("utc", func.now())
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def utc_from_timestamp(ts: float) -> datetime:
+    """Naive UTC datetime for a Unix timestamp, matching utc_now() columns"""
+    # Plain arithmetic: no local-timezone lookup as in fromtimestamp(), and
+    # the stored value doesn't depend on the server's TZ setting
+    return _EPOCH + timedelta(seconds=ts)
+
+
 def get_db():
     db = SessionLocal()
     try:
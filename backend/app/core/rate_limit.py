@@ -0,0 +1,20 @@
+from fastapi import Request
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+
+from app.core.config import settings
+
+
+def client_ip(request: Request) -> str:
+    """Client address as seen by nginx (every request arrives from the proxy)."""
+    return request.headers.get("x-real-ip") or get_remote_address(request)
+
+
+# Per-client limits for the bcrypt-heavy auth endpoints. In-memory storage is
+# enough for the single uvicorn worker; point RATE_LIMIT_STORAGE_URI at Redis
+# when running more than one.
+limiter = Limiter(
+    key_func=client_ip,
+    storage_uri=settings.rate_limit_storage_uri,
+    enabled=settings.rate_limit_enabled,
+)
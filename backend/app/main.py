@@ -1,22 +1,58 @@
+import asyncio
+import logging
 import os
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from slowapi import _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
 
 from app.api.routes import router
+from app.api.webhooks import router as webhooks_router, start_webhook_flusher
 from app.api.auth import router as auth_router
 from app.api.evolution import router as evolution_router
+from app.core.config import settings
 from app.core.database import engine, Base
+from app.core.rate_limit import limiter
+from app.services.evolution import evolution_service
+from app.services.whatsapp import whatsapp_service
+
+# Configure logging once; records below the level are dropped before formatting
+logging.basicConfig(
+    level=settings.log_level.upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+# httpx logs every outbound request at INFO
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.db_auto_create:
+        Base.metadata.create_all(bind=engine)
+    # Outbound HTTP clients are shared so connections are reused across requests
+    evolution_service.start()
+    whatsapp_service.start()
+    flusher = start_webhook_flusher()
+    yield
+    flusher.cancel()
+    with suppress(asyncio.CancelledError):
+        await flusher
+    await evolution_service.aclose()
+    await whatsapp_service.aclose()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title="No Lose SaaS",
     description="SaaS Application API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+app.state.limiter = limiter
+app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+
 # CORS middleware - configure origins based on environment
 cors_origins = [
     "http://localhost:3000",
@@ -44,6 +80,7 @@ app.add_middleware(
 
 # Include routes
 app.include_router(router, prefix="/api")
+app.include_router(webhooks_router, prefix="/api")
 app.include_router(auth_router, prefix="/api")
 app.include_router(evolution_router, prefix="/api")
 
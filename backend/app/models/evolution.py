@@ -1,15 +1,15 @@
-from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import deferred, relationship
 
-from app.core.database import Base
+from app.core.database import Base, utc_now
 
 
 class EvolutionInstance(Base):
     """Model for tracking WhatsApp Evolution API instances per user."""
     __tablename__ = "evolution_instances"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, unique=True)
 
     # Instance identification
@@ -19,7 +19,9 @@ class EvolutionInstance(Base):
     status = Column(String(50), default="disconnected")
 
     # QR Code data
-    qr_code = Column(Text, nullable=True)  # Base64 encoded QR code
+    # Base64 encoded QR code. This and raw_data are large and only ever
+    # written, so they're left out of row loads unless undefer()ed
+    qr_code = deferred(Column(Text, nullable=True), raiseload=True)
     qr_code_updated_at = Column(DateTime, nullable=True)
 
     # Profile info (populated after connection)
@@ -27,15 +29,15 @@ class EvolutionInstance(Base):
     profile_name = Column(String(255), nullable=True)
 
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=utc_now())
+    updated_at = Column(DateTime, server_default=utc_now(), onupdate=utc_now())
     last_connected_at = Column(DateTime, nullable=True)
 
     # Sync stats
     chats_count = Column(Integer, nullable=True)
 
     # Raw API response data
-    raw_data = Column(JSON, nullable=True)
+    raw_data = deferred(Column(JSONB, nullable=True), raiseload=True)
 
     # Relationship to user
-    user = relationship("User", back_populates="evolution_instance")
+    user = relationship("User", back_populates="evolution_instance", lazy="raise")
@@ -1,20 +1,25 @@
-from datetime import datetime
 from sqlalchemy import Column, Integer, String, DateTime, Boolean
 from sqlalchemy.orm import relationship
 
-from app.core.database import Base
+from app.core.database import Base, utc_now
 
 
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     email = Column(String(255), unique=True, index=True, nullable=False)
     hashed_password = Column(String(255), nullable=False)
+    # 1 = bcrypt(password), 2 = bcrypt(sha256(password)); see app.core.auth
+    password_algo_version = Column(Integer, nullable=False, server_default="1")
     name = Column(String(100), nullable=False)
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=utc_now())
+    updated_at = Column(DateTime, server_default=utc_now(), onupdate=utc_now())
 
-    # Relationship to Evolution instance
-    evolution_instance = relationship("EvolutionInstance", back_populates="user", uselist=False)
+    # Relationship to Evolution instance. lazy="raise" turns an accidental lazy
+    # load (e.g. during response serialization) into an error instead of a
+    # silent extra query; load it explicitly with selectinload/joinedload.
+    evolution_instance = relationship(
+        "EvolutionInstance", back_populates="user", uselist=False, lazy="raise"
+    )
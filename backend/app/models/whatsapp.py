@@ -1,46 +1,54 @@
-from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import deferred, relationship
 
-from app.core.database import Base
+from app.core.database import Base, utc_now
 
 
 class Contact(Base):
     __tablename__ = "contacts"
 
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)  # Owner of this contact
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # Owner of this contact
     wa_id = Column(String(50), index=True)  # WhatsApp ID (phone number)
     name = Column(String(255), nullable=True)
     profile_name = Column(String(255), nullable=True)
 
     # Evolution API specific fields
-    evolution_remote_jid = Column(String(100), nullable=True, index=True)  # e.g., 1234567890@s.whatsapp.net
+    # Looked up per user only, so ix_contacts_user_jid below is its index
+    evolution_remote_jid = Column(String(100), nullable=True)  # e.g., 1234567890@s.whatsapp.net
 
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=utc_now())
+    updated_at = Column(DateTime, server_default=utc_now(), onupdate=utc_now())
 
-    messages = relationship("Message", back_populates="contact")
-    conversations = relationship("Conversation", back_populates="contact")
+    # lazy="raise" on all relationships here, as on User/EvolutionInstance:
+    # load explicitly with selectinload/joinedload instead of per-row queries
+    messages = relationship("Message", back_populates="contact", lazy="raise")
+    conversations = relationship("Conversation", back_populates="contact", lazy="raise")
+
+    __table_args__ = (
+        Index("ix_contacts_user_wa", "user_id", "wa_id", unique=True),
+        Index("ix_contacts_user_jid", "user_id", "evolution_remote_jid", unique=True),
+    )
 
 
 class Conversation(Base):
     __tablename__ = "conversations"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     contact_id = Column(Integer, ForeignKey("contacts.id"))
-    started_at = Column(DateTime, default=datetime.utcnow)
-    last_message_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, server_default=utc_now())
+    last_message_at = Column(DateTime, server_default=utc_now())
     is_active = Column(Boolean, default=True)
 
-    contact = relationship("Contact", back_populates="conversations")
-    messages = relationship("Message", back_populates="conversation")
+    contact = relationship("Contact", back_populates="conversations", lazy="raise")
+    messages = relationship("Message", back_populates="conversation", lazy="raise")
 
 
 class Message(Base):
     __tablename__ = "messages"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)  # Owner of this message
     wa_message_id = Column(String(255), index=True)  # Cloud API message ID
     contact_id = Column(Integer, ForeignKey("contacts.id"))
@@ -63,11 +71,20 @@ class Message(Base):
     status = Column(String(50), default="received")  # sent, delivered, read, failed
 
     # Timestamps
-    timestamp = Column(DateTime)  # Original message timestamp
-    created_at = Column(DateTime, default=datetime.utcnow)
-
-    # Raw data for debugging
-    raw_data = Column(JSON, nullable=True)
-
-    contact = relationship("Contact", back_populates="messages")
-    conversation = relationship("Conversation", back_populates="messages")
+    # Original message timestamp. NOT NULL so every row can be a GET /messages
+    # cursor; a message that arrives without one gets the time we stored it
+    timestamp = Column(DateTime, nullable=False, server_default=utc_now())
+    created_at = Column(DateTime, server_default=utc_now())
+
+    # Raw data for debugging; never needed on read paths, so not loaded
+    # with the row (and raising if touched) unless asked for with undefer().
+    # Migration 013 LZ4-compresses it and TOASTs it out of the heap early
+    raw_data = deferred(Column(JSONB, nullable=True), raiseload=True)
+
+    contact = relationship("Contact", back_populates="messages", lazy="raise")
+    conversation = relationship("Conversation", back_populates="messages", lazy="raise")
+
+    __table_args__ = (
+        Index("ix_messages_contact_ts", "contact_id", timestamp.desc()),
+        Index("ix_messages_ts_id", timestamp.desc(), id.desc()),
+    )
@@ -5,20 +5,131 @@ Handles all interactions with Evolution API for WhatsApp messaging.
 Includes instance management, message fetching, and database synchronization.
 """
 
+import asyncio
+import importlib.util
 import logging
-from datetime import datetime
+import threading
+from datetime import datetime, timezone
+from itertools import islice
 from typing import Optional, List, Dict, Any
 
 import httpx
+from cachetools import TTLCache
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.core.database import utc_from_timestamp, utc_now
 from app.models.evolution import EvolutionInstance
 from app.models.whatsapp import Contact, Message, Conversation
 
 logger = logging.getLogger(__name__)
 
 
+# Evolution message payload key -> (message_type, content, media_url) parser;
+# a payload carries one content key, so the first match decides the type
+_MESSAGE_PARSERS = {
+    "conversation": lambda m: ("text", m, None),
+    "extendedTextMessage": lambda m: ("text", m.get("text"), None),
+    "imageMessage": lambda m: ("image", m.get("caption"), m.get("url")),
+    "videoMessage": lambda m: ("video", m.get("caption"), m.get("url")),
+    "audioMessage": lambda m: ("audio", None, m.get("url")),
+    "documentMessage": lambda m: ("document", m.get("fileName"), m.get("url")),
+    "stickerMessage": lambda m: ("sticker", None, None),
+}
+
+
+# Inline media in message payloads; often tens of KB and useless for debugging
+_RAW_PAYLOAD_DROP_KEYS = frozenset({"jpegThumbnail", "base64"})
+
+
+def raw_payload(evolution_message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The payload to keep in raw_data: inline media stripped, or None if disabled."""
+    if not settings.store_raw_payloads:
+        return None
+    message_data = evolution_message.get("message")
+    if not message_data:
+        return evolution_message
+
+    pruned = {}
+    for key, value in message_data.items():
+        if key in _RAW_PAYLOAD_DROP_KEYS:
+            continue
+        if isinstance(value, dict) and not _RAW_PAYLOAD_DROP_KEYS.isdisjoint(value):
+            value = {k: v for k, v in value.items() if k not in _RAW_PAYLOAD_DROP_KEYS}
+        pruned[key] = value
+    return {**evolution_message, "message": pruned}
+
+
+def parse_evolution_message(
+    evolution_message: Dict[str, Any],
+    user_id: int,
+    contact_id: int
+) -> Optional[Dict[str, Any]]:
+    """
+    Map an Evolution message to messages column values.
+
+    A pure function of its arguments (no session or service state), so bulk
+    backfills can map it over many messages or hand it to an executor.
+
+    Args:
+        evolution_message: Message data from Evolution API
+        user_id: Owner user ID
+        contact_id: Contact ID in our database
+
+    Returns:
+        Dict of Message column values, or None if the message has no key ID
+    """
+    key_data = evolution_message.get("key", {})
+    message_key_id = key_data.get("id")
+
+    if not message_key_id:
+        logger.warning("Message without key ID, skipping")
+        return None
+
+    # Determine message type and content
+    message_data = evolution_message.get("message", {})
+    for key, value in message_data.items():
+        parser = _MESSAGE_PARSERS.get(key)
+        if parser:
+            message_type, content, media_url = parser(value)
+            break
+    else:
+        # Unknown message type: note its payload keys. str() of the whole
+        # dict would render any inline base64 in full just to keep 500 chars,
+        # and raw_data already holds the payload itself
+        message_type = "unknown"
+        content = ",".join(islice(message_data, 8)) if message_data else None
+        media_url = None
+
+    # Parse timestamp
+    timestamp = None
+    if "messageTimestamp" in evolution_message:
+        ts = evolution_message["messageTimestamp"]
+        if isinstance(ts, (int, float)):
+            timestamp = utc_from_timestamp(ts)
+
+    # Determine direction
+    is_outbound = key_data.get("fromMe", False)
+
+    return {
+        "user_id": user_id,
+        "contact_id": contact_id,
+        "evolution_key_id": message_key_id,
+        "source": "evolution_api",
+        "message_type": message_type,
+        "content": content,
+        "media_url": media_url,
+        "is_outbound": is_outbound,
+        "status": "received" if not is_outbound else "sent",
+        # Naive UTC like utc_from_timestamp (an aware value would be shifted
+        # by the session TimeZone on the way into the naive column)
+        "timestamp": timestamp or datetime.now(timezone.utc).replace(tzinfo=None),
+        "raw_data": raw_payload(evolution_message),
+    }
+
+
 class EvolutionAPIError(Exception):
     """Custom exception for Evolution API errors."""
     def __init__(self, message: str, status_code: int = None, response_data: dict = None):
@@ -31,10 +142,88 @@ class EvolutionAPIError(Exception):
 class EvolutionAPIService:
     """Service class for interacting with Evolution API."""
 
+    # Evolution is a single upstream on the internal network; a small pool
+    # of kept-alive connections covers one worker's concurrency
+    max_connections = 20
+    max_keepalive_connections = 10
+
+    # Transient failures get a couple more tries with exponential backoff.
+    # Non-GET calls (sends) only retry when the request provably wasn't
+    # processed: a connect failure or a 429
+    max_retries = 2
+    retry_backoff = 0.5  # seconds, doubled each attempt
+    retry_statuses = frozenset({429, 502, 503, 504})
+    max_retry_wait = 5.0  # cap on a server-supplied Retry-After
+
+    # Per-chat history fetches run concurrently, up to this many at once
+    # across all syncs in the process; sync_all_chats writes the fetched
+    # rows in batches of this size
+    max_concurrent_fetches = 8
+    sync_write_batch_size = 500
+
+    # connectionState is polled by every open dashboard; a few seconds of
+    # staleness is invisible there, and state changes made through this
+    # service (or reported by webhook) drop the entry right away
+    status_cache_ttl = 5  # seconds
+
     def __init__(self):
         self.base_url = settings.evolution_api_url
         self.api_key = settings.evolution_api_key
         self.timeout = 30.0
+        self._client: Optional[httpx.AsyncClient] = None
+        self._fetch_slots: Optional[asyncio.Semaphore] = None
+        self._status_cache: TTLCache = TTLCache(maxsize=10_000, ttl=self.status_cache_ttl)
+        self._status_cache_lock = threading.Lock()
+
+    def _use_http2(self) -> bool:
+        """Whether the shared client should offer HTTP/2."""
+        if not settings.evolution_http2:
+            return False
+        if importlib.util.find_spec("h2") is None:
+            logger.warning("EVOLUTION_HTTP2 is set but h2 is not installed; using HTTP/1.1")
+            return False
+        if not self.base_url.startswith("https://"):
+            logger.warning("EVOLUTION_HTTP2 needs an https:// Evolution URL; using HTTP/1.1")
+            return False
+        return True
+
+    def start(self) -> None:
+        """Open the shared HTTP client; called from the app lifespan."""
+        # With HTTP/2 the concurrent history fetches share one multiplexed
+        # connection; httpx falls back to HTTP/1.1 per connection if the
+        # server doesn't negotiate h2, so no startup probe is needed
+        self._client = httpx.AsyncClient(
+            http2=self._use_http2(),
+            timeout=httpx.Timeout(self.timeout, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections
+            )
+        )
+
+    async def aclose(self) -> None:
+        """Close the shared HTTP client and its pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        # The semaphore binds to the running loop; the next start gets a new one
+        self._fetch_slots = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared client, opening it on first use outside the lifespan."""
+        # Scripts and bare TestClients never run the lifespan's start()
+        if self._client is None:
+            self.start()
+        return self._client
+
+    def _get_fetch_slots(self) -> asyncio.Semaphore:
+        """Return the semaphore bounding history fetches across concurrent syncs."""
+        # Shared rather than per call: two syncs running at once must not
+        # together overrun the pool, or the excess queues inside httpcore,
+        # whose pool scan grows quadratically with the queue
+        if self._fetch_slots is None:
+            self._fetch_slots = asyncio.Semaphore(self.max_concurrent_fetches)
+        return self._fetch_slots
 
     def _get_headers(self) -> Dict[str, str]:
         """Get headers for API requests."""
@@ -50,33 +239,58 @@ class EvolutionAPIService:
         data: dict = None,
         params: dict = None
     ) -> Dict[str, Any]:
-        """Make HTTP request to Evolution API."""
+        """Make HTTP request to Evolution API, retrying transient failures."""
         url = f"{self.base_url}{endpoint}"
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
+        for attempt in range(self.max_retries + 1):
+            retries_left = attempt < self.max_retries
             try:
-                response = await client.request(
+                # The pool's max_connections already bounds requests in flight
+                response = await self._get_client().request(
                     method=method,
                     url=url,
                     headers=self._get_headers(),
                     json=data,
                     params=params
                 )
-
-                if response.status_code >= 400:
-                    error_data = response.json() if response.content else {}
-                    raise EvolutionAPIError(
-                        message=f"Evolution API error: {response.status_code}",
-                        status_code=response.status_code,
-                        response_data=error_data
-                    )
-
-                return response.json() if response.content else {}
-
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                if retries_left:
+                    await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+                    continue
+                logger.error(f"Evolution API request error: {e}")
+                raise EvolutionAPIError(f"Connection error: {str(e)}")
             except httpx.RequestError as e:
                 logger.error(f"Evolution API request error: {e}")
                 raise EvolutionAPIError(f"Connection error: {str(e)}")
 
+            if retries_left and self._should_retry(method, response.status_code):
+                await asyncio.sleep(self._retry_delay(response, attempt))
+                continue
+            break
+
+        if response.status_code >= 400:
+            error_data = response.json() if response.content else {}
+            raise EvolutionAPIError(
+                message=f"Evolution API error: {response.status_code}",
+                status_code=response.status_code,
+                response_data=error_data
+            )
+
+        return response.json() if response.content else {}
+
+    def _should_retry(self, method: str, status_code: int) -> bool:
+        """Whether a response status is transient and safe to retry for this method."""
+        if status_code not in self.retry_statuses:
+            return False
+        return status_code == 429 or method.upper() == "GET"
+
+    def _retry_delay(self, response: httpx.Response, attempt: int) -> float:
+        """Seconds to wait before the next attempt, honouring Retry-After."""
+        retry_after = response.headers.get("retry-after", "")
+        if retry_after.isdigit():
+            return min(float(retry_after), self.max_retry_wait)
+        return self.retry_backoff * 2 ** attempt
+
     # ==================== Instance Management ====================
 
     async def create_instance(self, instance_name: str) -> Dict[str, Any]:
@@ -90,7 +304,10 @@ class EvolutionAPIService:
             "qrcode": True,
             "integration": "WHATSAPP-BAILEYS"
         }
-        return await self._make_request("POST", "/instance/create", data=data)
+        try:
+            return await self._make_request("POST", "/instance/create", data=data)
+        finally:
+            self.invalidate_instance_status(instance_name)
 
     async def connect_instance(self, instance_name: str) -> Dict[str, Any]:
         """
@@ -99,9 +316,12 @@ class EvolutionAPIService:
         GET /instance/connect/{name}
         Returns: { "pairingCode": null, "code": "2@...", "base64": "data:image/png;base64,...", "count": 1 }
         """
-        return await self._make_request("GET", f"/instance/connect/{instance_name}")
+        try:
+            return await self._make_request("GET", f"/instance/connect/{instance_name}")
+        finally:
+            self.invalidate_instance_status(instance_name)
 
-    async def get_instance_status(self, instance_name: str) -> Dict[str, Any]:
+    async def get_instance_status(self, instance_name: str, cached: bool = False) -> Dict[str, Any]:
         """
         Get connection state of an instance.
 
@@ -109,7 +329,17 @@ class EvolutionAPIService:
         Evolution API v2 returns: { "instance": { "instanceName": "...", "state": "open"|"close"|"connecting" } }
 
         Returns normalized: { "state": "open"|"close"|"connecting" }
+
+        With cached=True a state fetched in the last status_cache_ttl seconds
+        is returned without calling Evolution; flows waiting on a state change
+        should leave it off.
         """
+        if cached:
+            with self._status_cache_lock:
+                hit = self._status_cache.get(instance_name)
+            if hit is not None:
+                return hit
+
         result = await self._make_request("GET", f"/instance/connectionState/{instance_name}")
 
         # Normalize v2 response: state is inside instance.state
@@ -122,7 +352,17 @@ class EvolutionAPIService:
             if state == "close" and "state" in result:
                 state = result["state"]
 
-        return {"state": state, "raw": result}
+        # Stamped once the response is in, so the entry's TTL runs from
+        # when the state was actually observed
+        normalized = {"state": state, "raw": result}
+        with self._status_cache_lock:
+            self._status_cache[instance_name] = normalized
+        return normalized
+
+    def invalidate_instance_status(self, instance_name: str) -> None:
+        """Forget the cached connection state of an instance."""
+        with self._status_cache_lock:
+            self._status_cache.pop(instance_name, None)
 
     async def get_instance_qrcode(self, instance_name: str) -> Dict[str, Any]:
         """
@@ -139,7 +379,10 @@ class EvolutionAPIService:
 
         DELETE /instance/logout/{name}
         """
-        return await self._make_request("DELETE", f"/instance/logout/{instance_name}")
+        try:
+            return await self._make_request("DELETE", f"/instance/logout/{instance_name}")
+        finally:
+            self.invalidate_instance_status(instance_name)
 
     async def delete_instance(self, instance_name: str) -> Dict[str, Any]:
         """
@@ -147,7 +390,10 @@ class EvolutionAPIService:
 
         DELETE /instance/delete/{name}
         """
-        return await self._make_request("DELETE", f"/instance/delete/{instance_name}")
+        try:
+            return await self._make_request("DELETE", f"/instance/delete/{instance_name}")
+        finally:
+            self.invalidate_instance_status(instance_name)
 
     async def fetch_instances(self) -> List[Dict[str, Any]]:
         """
@@ -204,6 +450,44 @@ class EvolutionAPIService:
         result = await self._make_request("POST", f"/chat/findMessages/{instance_name}", data=data)
         return result if isinstance(result, list) else result.get("messages", [])
 
+    async def fetch_messages_many(
+        self,
+        instance_name: str,
+        remote_jids: List[str],
+        limit: int = 30
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Fetch message history for several chats concurrently.
+
+        Args:
+            instance_name: The Evolution instance name
+            remote_jids: WhatsApp JIDs of the chats to fetch
+            limit: Maximum number of messages to fetch per chat (default: 30)
+
+        Returns:
+            Messages per remote JID; chats whose fetch failed are left out
+        """
+        # Stay under the pool size so other requests still get a connection
+        semaphore = self._get_fetch_slots()
+
+        async def fetch(remote_jid: str) -> List[Dict[str, Any]]:
+            async with semaphore:
+                return await self.fetch_messages(instance_name, remote_jid, limit=limit)
+
+        results = await asyncio.gather(
+            *(fetch(remote_jid) for remote_jid in remote_jids), return_exceptions=True
+        )
+
+        messages_by_jid = {}
+        for remote_jid, result in zip(remote_jids, results):
+            if isinstance(result, EvolutionAPIError):
+                logger.warning(f"Fetching messages for {remote_jid} failed: {result.message}")
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                messages_by_jid[remote_jid] = result
+        return messages_by_jid
+
     # ==================== Sending Messages ====================
 
     async def send_text_message(
@@ -253,60 +537,137 @@ class EvolutionAPIService:
 
     # ==================== Database Sync ====================
 
-    def sync_contact_to_db(
+    def contact_to_row(
         self,
-        db: Session,
         evolution_contact: Dict[str, Any],
         user_id: int
-    ) -> Contact:
+    ) -> Dict[str, Any]:
         """
-        Sync a single Evolution contact to database.
+        Map an Evolution contact to contacts column values.
 
         Args:
-            db: Database session
             evolution_contact: Contact data from Evolution API
             user_id: Owner user ID
 
         Returns:
-            Contact object (created or updated)
+            Dict of Contact column values
         """
         remote_jid = evolution_contact.get("id", evolution_contact.get("remoteJid", ""))
-        # Extract phone number from JID (e.g., "1234567890@s.whatsapp.net" -> "1234567890")
-        phone_number = remote_jid.split("@")[0] if "@" in remote_jid else remote_jid
+        # Extract phone number from JID (e.g., "1234567890@s.whatsapp.net" -> "1234567890");
+        # partition is a single pass and leaves a bare number as is
+        phone_number = remote_jid.partition("@")[0]
 
-        # Try to find existing contact by remote_jid and user_id
-        contact = db.query(Contact).filter(
-            Contact.user_id == user_id,
-            Contact.evolution_remote_jid == remote_jid
-        ).first()
-
-        if not contact:
-            # Try to find by phone number
-            contact = db.query(Contact).filter(
-                Contact.user_id == user_id,
-                Contact.wa_id == phone_number
-            ).first()
-
-        if contact:
-            # Update existing contact
-            contact.evolution_remote_jid = remote_jid
-            contact.profile_name = evolution_contact.get("pushName", contact.profile_name)
-            contact.name = evolution_contact.get("name", contact.name) or contact.profile_name
-            contact.updated_at = datetime.utcnow()
-        else:
-            # Create new contact
-            contact = Contact(
-                user_id=user_id,
-                wa_id=phone_number,
-                evolution_remote_jid=remote_jid,
-                name=evolution_contact.get("name") or evolution_contact.get("pushName"),
-                profile_name=evolution_contact.get("pushName"),
-            )
-            db.add(contact)
+        return {
+            "user_id": user_id,
+            "wa_id": phone_number,
+            "evolution_remote_jid": remote_jid,
+            "name": evolution_contact.get("name") or evolution_contact.get("pushName"),
+            "profile_name": evolution_contact.get("pushName"),
+        }
+
+    def sync_contacts_to_db(
+        self,
+        db: Session,
+        evolution_contacts: List[Dict[str, Any]],
+        user_id: int
+    ) -> Dict[str, int]:
+        """
+        Upsert Evolution contacts to database in bulk, keyed on (user_id, wa_id).
+
+        Existing contacts get the new remote JID; name and profile name are only
+        overwritten when Evolution supplies a value.
+
+        Args:
+            db: Database session
+            evolution_contacts: Contacts from Evolution API (groups already removed)
+            user_id: Owner user ID
 
+        Returns:
+            Contact ID per remote JID for every contact upserted, ready to pass
+            on to sync_chat_history without looking the contacts up again
+        """
+        # One row per wa_id: ON CONFLICT can't update the same row twice
+        rows = {}
+        for evolution_contact in evolution_contacts:
+            row = self.contact_to_row(evolution_contact, user_id)
+            rows[row["wa_id"]] = row
+
+        if not rows:
+            return {}
+
+        stmt = pg_insert(Contact)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Contact.user_id, Contact.wa_id],
+            set_={
+                "evolution_remote_jid": stmt.excluded.evolution_remote_jid,
+                "name": func.coalesce(stmt.excluded.name, Contact.name),
+                "profile_name": func.coalesce(stmt.excluded.profile_name, Contact.profile_name),
+                "updated_at": utc_now(),
+            },
+        ).returning(Contact.evolution_remote_jid, Contact.id)
+        # executemany; SQLAlchemy batches the rows into multi-row VALUES and
+        # collects RETURNING from every batch
+        contact_ids = dict(db.execute(stmt, list(rows.values())).all())
         db.commit()
-        db.refresh(contact)
-        return contact
+        return contact_ids
+
+    def contact_ids_by_jid(
+        self,
+        db: Session,
+        push_names: Dict[str, Optional[str]],
+        user_id: int
+    ) -> Dict[str, int]:
+        """
+        Resolve remote JIDs to contact IDs, creating the missing contacts.
+
+        Existing contacts are loaded with one query; the rest are inserted in
+        one statement. Nothing is committed.
+
+        Args:
+            db: Database session
+            push_names: Push name to use for new contacts, keyed by remote JID
+            user_id: Owner user ID
+
+        Returns:
+            Contact ID for every JID in push_names
+        """
+        contact_ids = dict(db.query(Contact.evolution_remote_jid, Contact.id).filter(
+            Contact.user_id == user_id,
+            Contact.evolution_remote_jid.in_(push_names)
+        ).all())
+
+        # One row per wa_id: ON CONFLICT can't update the same row twice.
+        # JIDs sharing a wa_id (e.g. @s.whatsapp.net and @c.us) all map to it
+        rows = {}
+        jids_by_wa_id: Dict[str, List[str]] = {}
+        for remote_jid, push_name in push_names.items():
+            if remote_jid not in contact_ids:
+                phone_number = remote_jid.partition("@")[0]
+                rows.setdefault(phone_number, {
+                    "user_id": user_id,
+                    "wa_id": phone_number,
+                    "evolution_remote_jid": remote_jid,
+                    "profile_name": push_name,
+                })
+                jids_by_wa_id.setdefault(phone_number, []).append(remote_jid)
+
+        if rows:
+            # Atomic under concurrent deliveries: a contact inserted meanwhile,
+            # or synced under another JID, keeps its row and takes this JID
+            stmt = pg_insert(Contact).values(list(rows.values()))
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Contact.user_id, Contact.wa_id],
+                set_={
+                    "evolution_remote_jid": stmt.excluded.evolution_remote_jid,
+                    "profile_name": func.coalesce(Contact.profile_name, stmt.excluded.profile_name),
+                    "updated_at": utc_now(),
+                },
+            ).returning(Contact.wa_id, Contact.id)
+            for wa_id, contact_id in db.execute(stmt).all():
+                for remote_jid in jids_by_wa_id[wa_id]:
+                    contact_ids[remote_jid] = contact_id
+
+        return contact_ids
 
     def sync_message_to_db(
         self,
@@ -318,6 +679,11 @@ class EvolutionAPIService:
         """
         Sync a single Evolution message to database with deduplication.
 
+        Commits per call; to save several messages, build rows with
+        parse_evolution_message and hand them to sync_messages_to_db, which
+        inserts them in one statement and commits once (as sync_chat_history
+        does).
+
         Args:
             db: Database session
             evolution_message: Message data from Evolution API
@@ -327,85 +693,57 @@ class EvolutionAPIService:
         Returns:
             Message object or None if duplicate
         """
-        # Extract message key for deduplication
-        key_data = evolution_message.get("key", {})
-        message_key_id = key_data.get("id")
-
-        if not message_key_id:
-            logger.warning("Message without key ID, skipping")
+        row = parse_evolution_message(evolution_message, user_id, contact_id)
+        if not row:
             return None
 
-        # Check for duplicate
-        existing = db.query(Message).filter(
-            Message.evolution_key_id == message_key_id
-        ).first()
+        # Dedupe in the INSERT itself: a concurrent sync of the same key
+        # can't slip between a SELECT and the write
+        stmt = pg_insert(Message).values(**row).on_conflict_do_nothing(
+            index_elements=[Message.evolution_key_id]
+        ).returning(Message)
+        message = db.scalars(stmt).first()
+        db.commit()
 
-        if existing:
-            logger.debug(f"Duplicate message: {message_key_id}")
-            return None
+        if message is None:
+            logger.debug("Duplicate message: %s", row["evolution_key_id"])
+        return message
 
-        # Determine message type and content
-        message_data = evolution_message.get("message", {})
-        message_type = "text"
-        content = None
-        media_url = None
+    def insert_message_rows(self, db: Session, rows: List[Dict[str, Any]]) -> int:
+        """
+        Insert message rows in bulk, skipping known key IDs, without committing.
 
-        if "conversation" in message_data:
-            message_type = "text"
-            content = message_data["conversation"]
-        elif "extendedTextMessage" in message_data:
-            message_type = "text"
-            content = message_data["extendedTextMessage"].get("text")
-        elif "imageMessage" in message_data:
-            message_type = "image"
-            content = message_data["imageMessage"].get("caption")
-            media_url = message_data["imageMessage"].get("url")
-        elif "videoMessage" in message_data:
-            message_type = "video"
-            content = message_data["videoMessage"].get("caption")
-            media_url = message_data["videoMessage"].get("url")
-        elif "audioMessage" in message_data:
-            message_type = "audio"
-            media_url = message_data["audioMessage"].get("url")
-        elif "documentMessage" in message_data:
-            message_type = "document"
-            content = message_data["documentMessage"].get("fileName")
-            media_url = message_data["documentMessage"].get("url")
-        elif "stickerMessage" in message_data:
-            message_type = "sticker"
-        else:
-            # Unknown message type, store raw
-            message_type = "unknown"
-            content = str(message_data)[:500] if message_data else None
-
-        # Parse timestamp
-        timestamp = None
-        if "messageTimestamp" in evolution_message:
-            ts = evolution_message["messageTimestamp"]
-            if isinstance(ts, (int, float)):
-                timestamp = datetime.fromtimestamp(ts)
-
-        # Determine direction
-        is_outbound = key_data.get("fromMe", False)
-
-        message = Message(
-            user_id=user_id,
-            contact_id=contact_id,
-            evolution_key_id=message_key_id,
-            source="evolution_api",
-            message_type=message_type,
-            content=content,
-            media_url=media_url,
-            is_outbound=is_outbound,
-            status="received" if not is_outbound else "sent",
-            timestamp=timestamp or datetime.utcnow(),
-            raw_data=evolution_message
-        )
+        Args:
+            db: Database session
+            rows: Message column values from parse_evolution_message
 
-        db.add(message)
+        Returns:
+            Number of new messages inserted
+        """
+        if not rows:
+            return 0
+        stmt = pg_insert(Message).on_conflict_do_nothing(
+            index_elements=[Message.evolution_key_id]
+        ).returning(Message.id)
+        # executemany rather than .values(rows): SQLAlchemy pages the rows
+        # into multi-row VALUES, keeping large syncs under Postgres's
+        # 65535 bind-parameter limit, and gathers RETURNING across pages
+        return len(db.execute(stmt, rows).all())
+
+    def sync_messages_to_db(self, db: Session, rows: List[Dict[str, Any]]) -> int:
+        """
+        Insert message rows in bulk, skipping known key IDs, and commit.
+
+        Args:
+            db: Database session
+            rows: Message column values from parse_evolution_message
+
+        Returns:
+            Number of new messages inserted
+        """
+        inserted = self.insert_message_rows(db, rows)
         db.commit()
-        db.refresh(message)
-        return message
+        return inserted
 
     def sync_chat_history(
         self,
@@ -415,7 +753,7 @@ class EvolutionAPIService:
         contact_id: int
     ) -> int:
         """
-        Sync multiple messages to database.
+        Sync multiple messages to database in one insert and one commit.
 
         Args:
             db: Database session
@@ -426,13 +764,95 @@ class EvolutionAPIService:
         Returns:
             Number of new messages synced
         """
-        synced_count = 0
+        rows = []
         for msg in messages:
-            result = self.sync_message_to_db(db, msg, user_id, contact_id)
-            if result:
-                synced_count += 1
+            row = parse_evolution_message(msg, user_id, contact_id)
+            if row:
+                rows.append(row)
+        # Known key IDs are skipped by ON CONFLICT, so no dedupe SELECT first
+        return self.sync_messages_to_db(db, rows)
+
+    async def sync_all_chats(
+        self,
+        db: Session,
+        instance_name: str,
+        user_id: int,
+        contact_ids: Dict[str, int],
+        limit: int = 30
+    ) -> int:
+        """
+        Sync message history for many chats, overlapping fetches with DB writes.
+
+        Fetchers (up to max_concurrent_fetches, shared with any other sync
+        in progress) parse each chat's messages
+        into rows and queue them; a single writer inserts them in batches of
+        sync_write_batch_size in a worker thread, so the event loop keeps
+        fetching while Postgres writes. Chats whose fetch fails, and messages
+        that don't parse, are skipped. All batches share one transaction,
+        committed once at the end.
 
-        return synced_count
+        Args:
+            db: Database session, used only by the writer
+            instance_name: The Evolution instance name
+            user_id: Owner user ID
+            contact_ids: Contact ID per remote JID of the chats to sync
+            limit: Maximum number of messages to fetch per chat (default: 30)
+
+        Returns:
+            Number of new messages synced
+        """
+        semaphore = self._get_fetch_slots()
+        # Unbounded: a writer that fails must not leave fetchers blocked on put
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def fetch(remote_jid: str, contact_id: int) -> None:
+            async with semaphore:
+                try:
+                    messages = await self.fetch_messages(instance_name, remote_jid, limit=limit)
+                except EvolutionAPIError as e:
+                    logger.warning(f"Fetching messages for {remote_jid} failed: {e.message}")
+                    return
+            rows = []
+            for message in messages:
+                try:
+                    row = parse_evolution_message(message, user_id, contact_id)
+                except (AttributeError, TypeError, ValueError) as e:
+                    logger.warning(f"Skipping malformed message in {remote_jid}: {e}")
+                    continue
+                if row:
+                    rows.append(row)
+            if rows:
+                await queue.put(rows)
+
+        async def write() -> int:
+            inserted = 0
+            batch = []
+            while (rows := await queue.get()) is not None:
+                batch.extend(rows)
+                if len(batch) >= self.sync_write_batch_size:
+                    inserted += await asyncio.to_thread(self.insert_message_rows, db, batch)
+                    batch = []
+            if batch:
+                inserted += await asyncio.to_thread(self.insert_message_rows, db, batch)
+            return inserted
+
+        writer = asyncio.create_task(write())
+        fetchers = asyncio.gather(*(fetch(jid, cid) for jid, cid in contact_ids.items()))
+        try:
+            # The writer only returns once handed None, so finishing first
+            # means it failed: stop fetching instead of working through every
+            # chat before the error surfaces
+            await asyncio.wait({writer, fetchers}, return_when=asyncio.FIRST_COMPLETED)
+            if writer.done():
+                fetchers.cancel()
+            await fetchers
+        finally:
+            # Let the writer finish before anything else touches the session;
+            # on failure the uncommitted batches roll back with it
+            queue.put_nowait(None)
+            inserted = await writer
+        await asyncio.to_thread(db.commit)
+        return inserted
 
 
 # Singleton instance
@@ -1,18 +1,72 @@
 import httpx
-from datetime import datetime
-from typing import Optional
+import logging
+from typing import List, Optional
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.core.database import utc_from_timestamp, utc_now
 from app.models.whatsapp import Contact, Message, Conversation
 
+logger = logging.getLogger(__name__)
+
+
+MEDIA_CHUNK_SIZE = 64 * 1024
+
+
+def _media_fields(media_info: dict):
+    return media_info.get("caption"), media_info.get("id")
+
+
+# Cloud API message type -> (content, media_id) parser for its payload object
+_CLOUD_MESSAGE_PARSERS = {
+    "text": lambda text: (text.get("body"), None),
+    "image": _media_fields,
+    "video": _media_fields,
+    "audio": _media_fields,
+    "document": _media_fields,
+}
+
 
 class WhatsAppService:
+    # Same pool shape as the Evolution client: one worker, one upstream host
+    max_connections = 20
+    max_keepalive_connections = 10
+
     def __init__(self):
         self.base_url = settings.wa_api_base_url
         self.access_token = settings.wa_access_token
         self.phone_number_id = settings.wa_phone_number_id
         self.business_account_id = settings.wa_business_account_id
+        self.timeout = 10.0
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def start(self):
+        """Open the shared HTTP client; called from the app lifespan."""
+        # Reusing one client keeps TLS connections to the Graph API alive;
+        # base URL and auth headers are set once here rather than per call
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self._get_headers(),
+            timeout=httpx.Timeout(self.timeout, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections
+            )
+        )
+
+    async def aclose(self):
+        """Close the shared HTTP client and its pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared client, opening it on first use outside the lifespan."""
+        # Scripts and bare TestClients never run the lifespan's start()
+        if self._client is None:
+            self.start()
+        return self._client
 
     def _get_headers(self):
         return {
@@ -22,156 +76,148 @@ class WhatsAppService:
 
     async def verify_token(self) -> dict:
         """Verify the access token is valid"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/me",
-                headers=self._get_headers()
-            )
-            return response.json()
+        response = await self._get_client().get("/me")
+        return response.json()
 
     async def get_business_profile(self) -> dict:
         """Get WhatsApp Business Profile info"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/{self.phone_number_id}/whatsapp_business_profile",
-                headers=self._get_headers(),
-                params={"fields": "about,address,description,email,profile_picture_url,websites,vertical"}
-            )
-            return response.json()
+        response = await self._get_client().get(
+            f"/{self.phone_number_id}/whatsapp_business_profile",
+            params={"fields": "about,address,description,email,profile_picture_url,websites,vertical"}
+        )
+        return response.json()
 
     async def get_phone_numbers(self) -> dict:
         """Get all phone numbers associated with the business account"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/{self.business_account_id}/phone_numbers",
-                headers=self._get_headers()
-            )
-            return response.json()
+        response = await self._get_client().get(f"/{self.business_account_id}/phone_numbers")
+        return response.json()
 
     async def get_message_templates(self) -> dict:
         """Get message templates"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/{self.business_account_id}/message_templates",
-                headers=self._get_headers()
-            )
-            return response.json()
+        response = await self._get_client().get(f"/{self.business_account_id}/message_templates")
+        return response.json()
 
     async def download_media(self, media_id: str) -> dict:
         """Get media URL by media ID"""
-        async with httpx.AsyncClient() as client:
-            # First get the media URL
-            response = await client.get(
-                f"{self.base_url}/{media_id}",
-                headers=self._get_headers()
-            )
-            media_info = response.json()
-
-            if "url" in media_info:
-                # Download the actual media
-                media_response = await client.get(
-                    media_info["url"],
-                    headers=self._get_headers()
-                )
+        # First get the media URL
+        response = await self._get_client().get(f"/{media_id}")
+        media_info = response.json()
+
+        if "url" in media_info:
+            # Download the actual media, streamed: videos can run to 100MB, so
+            # count the bytes as they arrive rather than holding the body
+            async with self._get_client().stream("GET", media_info["url"]) as media_response:
+                size = 0
+                async for chunk in media_response.aiter_bytes(MEDIA_CHUNK_SIZE):
+                    size += len(chunk)
                 return {
                     "info": media_info,
                     "content_type": media_response.headers.get("content-type"),
-                    "size": len(media_response.content)
+                    "size": size
                 }
-            return media_info
+        return media_info
 
     async def send_test_message(self, to_phone: str, message: str) -> dict:
         """Send a test text message"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/{self.phone_number_id}/messages",
-                headers=self._get_headers(),
-                json={
-                    "messaging_product": "whatsapp",
-                    "to": to_phone,
-                    "type": "text",
-                    "text": {"body": message}
-                }
-            )
-            return response.json()
-
-    def save_incoming_message(self, db: Session, webhook_data: dict) -> Optional[Message]:
-        """Process and save incoming webhook message"""
-        try:
-            entry = webhook_data.get("entry", [{}])[0]
-            changes = entry.get("changes", [{}])[0]
-            value = changes.get("value", {})
-
-            messages = value.get("messages", [])
-            contacts = value.get("contacts", [])
-
-            if not messages:
-                return None
-
-            msg_data = messages[0]
-            contact_data = contacts[0] if contacts else {}
-
-            # Get or create contact
-            wa_id = contact_data.get("wa_id") or msg_data.get("from")
-            contact = db.query(Contact).filter(Contact.wa_id == wa_id).first()
-
-            if not contact:
-                contact = Contact(
-                    wa_id=wa_id,
-                    profile_name=contact_data.get("profile", {}).get("name")
-                )
-                db.add(contact)
-                db.commit()
-                db.refresh(contact)
-
-            # Get or create conversation
-            conversation = db.query(Conversation).filter(
-                Conversation.contact_id == contact.id,
-                Conversation.is_active == True
-            ).first()
-
-            if not conversation:
-                conversation = Conversation(contact_id=contact.id)
-                db.add(conversation)
-                db.commit()
-                db.refresh(conversation)
-
-            # Create message
-            msg_type = msg_data.get("type", "text")
-            content = None
-            media_id = None
+        response = await self._get_client().post(
+            f"/{self.phone_number_id}/messages",
+            json={
+                "messaging_product": "whatsapp",
+                "to": to_phone,
+                "type": "text",
+                "text": {"body": message}
+            }
+        )
+        return response.json()
+
+    def save_incoming_messages(self, db: Session, batch: List[dict]) -> int:
+        """Save a batch of webhook payloads in one commit; returns the count saved"""
+        saved = 0
+        # wa_id -> (contact_id, conversation) already resolved in this batch,
+        # so a burst from one sender looks its contact up once
+        resolved = {}
+        for webhook_data in batch:
+            # A savepoint per payload keeps one malformed event from
+            # discarding the rest of the batch
+            try:
+                with db.begin_nested():
+                    saved += self._stage_incoming_messages(db, webhook_data, resolved)
+            except Exception as e:
+                # Rows created under the rolled-back savepoint are gone
+                resolved.clear()
+                logger.error(f"Skipping webhook payload: {e}")
+        db.commit()
+        return saved
+
+    def _stage_incoming_messages(self, db: Session, webhook_data: dict, resolved: dict) -> int:
+        """Add the payload's messages (and contacts/conversations) to the session without committing"""
+        entry = webhook_data.get("entry", [{}])[0]
+        changes = entry.get("changes", [{}])[0]
+        value = changes.get("value", {})
+
+        messages = value.get("messages", [])
+        contacts = value.get("contacts", [])
+
+        if not messages:
+            return 0
+
+        profile_names = {c.get("wa_id"): c.get("profile", {}).get("name") for c in contacts}
+        default_wa_id = contacts[0].get("wa_id") if contacts else None
+
+        touched = {}
+        for msg_data in messages:
+            wa_id = msg_data.get("from") or default_wa_id
+            if wa_id not in resolved:
+                resolved[wa_id] = self._contact_conversation(db, wa_id, profile_names.get(wa_id))
+            contact_id, conversation = resolved[wa_id]
 
-            if msg_type == "text":
-                content = msg_data.get("text", {}).get("body")
-            elif msg_type in ["image", "video", "audio", "document"]:
-                media_info = msg_data.get(msg_type, {})
-                media_id = media_info.get("id")
-                content = media_info.get("caption")
+            msg_type = msg_data.get("type", "text")
+            parser = _CLOUD_MESSAGE_PARSERS.get(msg_type)
+            content, media_id = parser(msg_data.get(msg_type, {})) if parser else (None, None)
 
-            message = Message(
+            db.add(Message(
                 wa_message_id=msg_data.get("id"),
-                contact_id=contact.id,
+                contact_id=contact_id,
                 conversation_id=conversation.id,
                 message_type=msg_type,
                 content=content,
                 media_id=media_id,
                 is_outbound=False,
-                timestamp=datetime.fromtimestamp(int(msg_data.get("timestamp", 0))),
-                raw_data=msg_data
-            )
-            db.add(message)
-
-            # Update conversation
-            conversation.last_message_at = datetime.utcnow()
-
-            db.commit()
-            db.refresh(message)
-
-            return message
-
-        except Exception as e:
-            db.rollback()
-            raise e
+                timestamp=utc_from_timestamp(int(msg_data.get("timestamp", 0))),
+                raw_data=msg_data if settings.store_raw_payloads else None
+            ))
+            touched[conversation.id] = conversation
+
+        # Update conversations, once each however many messages they got
+        for conversation in touched.values():
+            conversation.last_message_at = utc_now()
+        db.flush()
+
+        return len(messages)
+
+    def _contact_conversation(self, db: Session, wa_id: str, profile_name: Optional[str]):
+        """(contact_id, active conversation) for wa_id, creating either if missing"""
+        # 2.0-style select() on this per-sender path, and only the id: the
+        # contact row itself is never needed here
+        contact_id = db.scalar(select(Contact.id).where(Contact.wa_id == wa_id).limit(1))
+
+        if contact_id is None:
+            contact = Contact(wa_id=wa_id, profile_name=profile_name)
+            db.add(contact)
+            db.flush()
+            contact_id = contact.id
+
+        conversation = db.scalars(select(Conversation).where(
+            Conversation.contact_id == contact_id,
+            Conversation.is_active == True
+        ).limit(1)).first()
+
+        if not conversation:
+            conversation = Conversation(contact_id=contact_id)
+            db.add(conversation)
+            db.flush()
+
+        return contact_id, conversation
 
 
 whatsapp_service = WhatsAppService()